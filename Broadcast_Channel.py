@@ -0,0 +1,182 @@
+"""
+BROADCAST CHANNEL FOR THE TD4 STATS WORKERS
+-------------------------------------------
+In TD4 Ex2, stat_main() puts the data *once* on a single Queue shared by the five operation threads: only the
+first thread to call get() receives it, the others wait until the sentinels arrive. A process version with one
+multiprocessing.Queue per worker would pickle the whole list once per worker.
+
+Broadcast is a publish/subscribe channel: every subscriber has its own queue, and publish(data) delivers the
+same read-only dataset to all of them, at the cost of one copy whatever the number of subscribers:
+- threads (processes=False): every queue gets a reference to the same object, made read-only if it is a NumPy
+  array, so the dataset is never copied;
+- processes (processes=True): the data is copied once into a multiprocessing.shared_memory block
+  (SharedNDArray, see SharedArray_NumPy.py) and every queue gets only its handle (name, dtype, shape); each
+  subscriber maps the same memory.
+
+A Subscription has get() and task_done() like a queue.Queue, so TD4's worker() works unchanged with it.
+Completion is tracked per subscriber: task_done(result) acknowledges the message (with an optional result),
+join(message) waits for every subscriber and returns {subscriber: result}, pending(message) tells who has not
+finished yet. The shared memory block of a message is released once every subscriber has acknowledged it.
+
+    python Broadcast_Channel.py < data.txt                 # TD4's stat_main with threads
+    python Broadcast_Channel.py --processes < data.txt     # one process per operation
+"""
+import sys
+import queue
+import threading
+import itertools
+import multiprocessing
+from multiprocessing import resource_tracker
+
+import numpy as np
+
+from SharedArray_NumPy import SharedNDArray
+from Numeric_Parser import parse_stream, stdev
+from TD4 import worker
+
+
+class Subscription:
+    """A subscriber's end of the channel: get() the next dataset, task_done() when finished with it."""
+    def __init__(self, name, messages, acks):
+        self.name = name
+        self.messages = messages
+        self.acks = acks
+        self.current = None
+        self._shared = None
+
+    def get(self):
+        """Next published dataset, or None once the channel is closed."""
+        self._detach()
+        message = self.messages.get()
+        if message is None:
+            return None
+        self.current, data = message
+        if isinstance(data, SharedNDArray):
+            self._shared = data
+            data = data.array
+            data.flags.writeable = False
+        return data
+
+    def task_done(self, result=None):
+        """Acknowledge the current dataset, with an optional result for the publisher."""
+        self.acks.put((self.name, self.current, result))
+
+    def _detach(self):
+        if self._shared is not None:
+            try:
+                self._shared.close()
+            except BufferError:
+                pass    # the worker still holds the previous array: the mapping goes with the process
+            self._shared = None
+
+
+class Broadcast:
+    def __init__(self, processes=False):
+        self.processes = processes
+        self.acks = multiprocessing.SimpleQueue() if processes else queue.Queue()
+        self.subscriptions = {}
+        self.acked = {}         # message -> {subscriber: result}
+        self.shared = {}        # message -> SharedNDArray to release once everybody is done
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        if processes:
+            # start the resource tracker now, so that forked subscribers share it instead of starting their own
+            # (which would warn about blocks attached by a subscriber but unlinked by the publisher)
+            resource_tracker.ensure_running()
+
+    def subscribe(self, name=None):
+        """New subscriber; with processes, subscribe before starting the process that uses it."""
+        name = len(self.subscriptions) if name is None else name
+        messages = multiprocessing.SimpleQueue() if self.processes else queue.Queue()
+        self.subscriptions[name] = Subscription(name, messages, self.acks)
+        return self.subscriptions[name]
+
+    def publish(self, data):
+        """Deliver `data` to every subscriber, return the message id."""
+        message = next(self._ids)
+        if self.processes:
+            payload = self.shared[message] = SharedNDArray.from_array(np.asarray(data, dtype=np.float64))
+        else:
+            payload = data
+            if isinstance(payload, np.ndarray):
+                payload.flags.writeable = False
+        self.acked[message] = {}
+        for subscription in self.subscriptions.values():
+            subscription.messages.put((message, payload))
+        return message
+
+    def _collect(self, block=True):
+        with self._lock:
+            if self.processes:
+                if not block and self.acks.empty():
+                    return False
+                name, message, result = self.acks.get()
+            else:
+                try:
+                    name, message, result = self.acks.get(block)
+                except queue.Empty:
+                    return False
+            done = self.acked[message]
+            done[name] = result
+            if len(done) == len(self.subscriptions) and message in self.shared:
+                shared = self.shared.pop(message)
+                shared.close()
+                shared.unlink()
+            return True
+
+    def pending(self, message):
+        """Subscribers that have not acknowledged `message` yet."""
+        while self._collect(block=False):
+            pass
+        return [name for name in self.subscriptions if name not in self.acked[message]]
+
+    def join(self, message):
+        """Wait until every subscriber has acknowledged `message`, return {subscriber: result}."""
+        while len(self.acked[message]) < len(self.subscriptions):
+            self._collect()
+        return self.acked[message]
+
+    def close(self):
+        """Tell every subscriber that nothing more will be published."""
+        for subscription in self.subscriptions.values():
+            subscription.messages.put(None)
+
+
+def process_worker(subscription, operation):
+    """Process subscriber: compute the statistic of every dataset and send it back with the acknowledgement."""
+    while (data := subscription.get()) is not None:
+        subscription.task_done(float(operation(data)))
+
+
+def stat_main(processes=False, stream=None):
+    data = parse_stream(stream or sys.stdin.buffer,
+                        on_error=lambda token, position, index: print(f"bad number: {token}"))
+
+    # If no valid data is entered, exit early
+    if not len(data):
+        print("No valid data entered.")
+        return
+
+    operations = [np.min, np.max, np.median, np.mean, stdev]
+    channel = Broadcast(processes)
+    if processes:
+        workers = [multiprocessing.Process(target=process_worker, args=(channel.subscribe(op.__name__), op))
+                   for op in operations]
+    else:
+        # TD4's worker, unchanged: a Subscription behaves like its queue
+        workers = [threading.Thread(target=worker, args=(channel.subscribe(op.__name__), op)) for op in operations]
+    for w in workers:
+        w.start()
+
+    message = channel.publish(data)
+    results = channel.join(message)     # every worker, not just the first one, got the data
+    channel.close()
+    for w in workers:
+        w.join()
+    if processes:
+        for operation in operations:
+            print(f"{operation.__name__.capitalize()}: {results[operation.__name__]}")
+
+
+if __name__ == "__main__":
+    stat_main(processes="--processes" in sys.argv[1:])
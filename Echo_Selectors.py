@@ -0,0 +1,199 @@
+"""
+EVENT-DRIVEN ECHO SERVER
+------------------------
+The TD3 Ex2 echo server starts a whole multiprocessing.Process for every accepted connection:
+a process spawn per client, and the machine gives up after a few hundred concurrent clients.
+
+This server handles every client in a single process and a single thread, with an event loop:
+- every socket is non-blocking, and the selectors module (epoll on Linux) tells the loop which sockets are
+  ready to be read or written, so the loop never blocks on one client while others are waiting;
+- every connection has its own output buffer: send() may accept only part of the data (the client reads slowly),
+  what is left stays in the buffer and is sent when the socket becomes writable again.
+  This is the non-blocking equivalent of sendall();
+- backpressure: when the output buffer of a client exceeds HIGH_WATER bytes, the server stops reading from
+  that client until the buffer has drained below LOW_WATER, so a client that sends without reading cannot
+  make the server's memory grow without bound;
+- a client may shut down its sending side and still wait for the echo (half-close): on end of file the server
+  stops reading, and only closes the connection once the output buffer has been sent.
+
+With processes > 1, the server forks one event loop per core. Every loop opens its own listening socket on the
+same port with the SO_REUSEPORT option, and the kernel spreads the incoming connections between them.
+
+    python Echo_Selectors.py            # one loop
+    python Echo_Selectors.py 4          # 4 loops sharing port 6666
+"""
+import sys
+import socket
+import signal
+import selectors
+import multiprocessing
+
+HOST = "localhost"
+PORT = 6666
+BUFSIZE = 65536
+HIGH_WATER = 1 << 20    # stop reading from a client whose pending output exceeds this
+LOW_WATER = 1 << 16     # resume reading once it has drained below this
+
+
+def raise_fd_limit():
+    """Tens of thousands of clients need as many file descriptors: raise the soft limit to the hard one."""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+class Connection:
+    """State of one client: its socket, its pending output and whether we are reading from it."""
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.outbuf = bytearray()
+        self.reading = True
+        self.closing = False    # the client sent EOF: close once outbuf is sent
+
+
+class EchoServer:
+    def __init__(self, host=HOST, port=PORT, reuse_port=False, backlog=socket.SOMAXCONN):
+        self.selector = selectors.DefaultSelector()
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.server_socket.bind((host, port))
+        self.server_socket.listen(backlog)
+        self.server_socket.setblocking(False)
+        self.address = self.server_socket.getsockname()
+        self.selector.register(self.server_socket, selectors.EVENT_READ, None)
+
+        # stop() writes a byte into this pair of sockets to wake the loop up from select()
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self.selector.register(self._wakeup_r, selectors.EVENT_READ, "wakeup")
+        self.serve = True
+        self.clients = 0
+
+    def stop(self):
+        """Stop the loop; safe to call from another thread or a signal handler."""
+        self.serve = False
+        try:
+            self._wakeup_w.send(b"\0")
+        except OSError:
+            pass
+
+    def serve_forever(self):
+        try:
+            while self.serve:
+                for key, events in self.selector.select():
+                    if key.data is None:
+                        self._accept()
+                    elif key.data == "wakeup":
+                        self._wakeup_r.recv(BUFSIZE)
+                    else:
+                        if events & selectors.EVENT_READ:
+                            self._read(key.data)
+                        if events & selectors.EVENT_WRITE and key.data.sock.fileno() != -1:
+                            self._write(key.data)
+        finally:
+            self.close()
+
+    def _accept(self):
+        # Accept every pending connection, not only one per wake-up
+        while True:
+            try:
+                client_socket, address = self.server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:     # e.g. out of file descriptors: retry on the next event
+                return
+            client_socket.setblocking(False)
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.selector.register(client_socket, selectors.EVENT_READ, Connection(client_socket, address))
+            self.clients += 1
+
+    def _read(self, conn):
+        try:
+            data = conn.sock.recv(BUFSIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            return self._disconnect(conn)
+        if not data:                # the client has closed its side: finish sending its echo, then close
+            conn.closing = True
+            conn.reading = False
+            return self._write(conn)
+        conn.outbuf += data
+        self._write(conn)
+
+    def _write(self, conn):
+        if conn.outbuf:
+            try:
+                sent = conn.sock.send(conn.outbuf)
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            except OSError:
+                return self._disconnect(conn)
+            del conn.outbuf[:sent]
+        if conn.closing and not conn.outbuf:
+            return self._disconnect(conn)
+        self._update_interest(conn)
+
+    def _update_interest(self, conn):
+        # Backpressure: only read from a client while its pending output is reasonable
+        if conn.reading and len(conn.outbuf) > HIGH_WATER:
+            conn.reading = False
+        elif not conn.reading and not conn.closing and len(conn.outbuf) < LOW_WATER:
+            conn.reading = True
+        events = (selectors.EVENT_READ if conn.reading else 0) | (selectors.EVENT_WRITE if conn.outbuf else 0)
+        if events != self.selector.get_key(conn.sock).events:
+            self.selector.modify(conn.sock, events, conn)
+
+    def _disconnect(self, conn):
+        self.selector.unregister(conn.sock)
+        conn.sock.close()
+        self.clients -= 1
+
+    def close(self):
+        for key in list(self.selector.get_map().values()):
+            if isinstance(key.data, Connection):
+                key.fileobj.close()
+        self.selector.close()
+        self.server_socket.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+
+
+def run_loop(host, port, reuse_port):
+    server = EchoServer(host, port, reuse_port=reuse_port)
+    signal.signal(signal.SIGTERM, lambda sig, frame: server.stop())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(host=HOST, port=PORT, processes=1):
+    """Run `processes` event loops on the same port (SO_REUSEPORT when more than one)."""
+    raise_fd_limit()
+    if processes == 1:
+        return run_loop(host, port, False)
+    loops = [multiprocessing.Process(target=run_loop, args=(host, port, True)) for _ in range(processes)]
+    for p in loops:
+        p.start()
+    # Forward a termination request to every loop
+    signal.signal(signal.SIGTERM, lambda sig, frame: [p.terminate() for p in loops])
+    try:
+        for p in loops:
+            p.join()
+    except KeyboardInterrupt:
+        for p in loops:
+            p.terminate()
+            p.join()
+
+
+if __name__ == "__main__":
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    print(f"Echo server listening on {HOST}:{PORT} with {processes} event loop(s)")
+    serve(HOST, PORT, processes)
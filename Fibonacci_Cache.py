@@ -0,0 +1,154 @@
+"""
+FAST-DOUBLING FIBONACCI WITH A SHARED CACHE
+-------------------------------------------
+The fibonacci(n) of Thread&ProcessPools.py, Python_Threads.py and TD1.py iterates n times.
+The fast-doubling identities compute F(n) in O(log n) steps instead:
+
+    F(2k)   = F(k) * (2*F(k+1) - F(k))
+    F(2k+1) = F(k)**2 + F(k+1)**2
+
+Besides, pool workers get indexes from random.randint(0, 100): the same indexes come back over and over,
+and every worker recomputes them. Behind the kernel sits a bounded LRU cache of pairs (F(k), F(k+1)):
+- one cache lives in a Manager server process and is shared by every pool worker,
+- every worker keeps a small local copy in front of it, so repeated indexes do not even cost a round trip.
+Since a pair (F(k), F(k+1)) is enough to walk the sequence both ways, an index close to a cached one
+("nearby", within NEAR steps) is served by a few additions instead of a full computation.
+
+Both caches count their hits, nearby hits and misses (stats()).
+Careful: a Manager round trip costs tens of microseconds. For indexes around 100 the fast-doubling kernel
+alone is cheaper than that; the shared cache pays off for large indexes (thousands of digits).
+"""
+import time
+import random
+import multiprocessing
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+
+NEAR = 16           # an index at most NEAR steps away from a cached one is a nearby hit
+LOCAL_SIZE = 256    # entries of the per-process cache
+
+
+def fib_pair(n):
+    """Return (F(n), F(n+1)) by fast doubling, O(log n) multiplications."""
+    a, b = 0, 1    # (F(0), F(1))
+    for bit in bin(n)[2:]:
+        c = a * (2 * b - a)    # F(2k)
+        d = a * a + b * b      # F(2k+1)
+        if bit == "1":
+            a, b = d, c + d    # (F(2k+1), F(2k+2))
+        else:
+            a, b = c, d        # (F(2k), F(2k+1))
+    return a, b
+
+
+def fast_fibonacci(n):
+    """Same result as the fibonacci of Thread&ProcessPools.py: (n, F(n))."""
+    return (n, fib_pair(n)[0])
+
+
+def walk(k, a, b, n):
+    """From (F(k), F(k+1)), step to (F(n), F(n+1))."""
+    while k < n:
+        a, b = b, a + b
+        k += 1
+    while k > n:
+        a, b = b - a, a
+        k -= 1
+    return a, b
+
+
+class FibCache:
+    """Bounded LRU cache of pairs k -> (F(k), F(k+1)) with hit/miss counters."""
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.pairs = OrderedDict()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def lookup(self, n, near=NEAR):
+        """Return (k, F(k), F(k+1)) for n itself or the closest cached index within `near`, else None."""
+        for k in [n] + [n + s * d for d in range(1, near + 1) for s in (-1, 1)]:
+            if k in self.pairs:
+                self.pairs.move_to_end(k)
+                if k == n:
+                    self.hits += 1
+                else:
+                    self.near_hits += 1
+                return (k,) + self.pairs[k]
+        self.misses += 1
+        return None
+
+    def store(self, n, a, b):
+        self.pairs[n] = (a, b)
+        self.pairs.move_to_end(n)
+        while len(self.pairs) > self.maxsize:
+            self.pairs.popitem(last=False)    # evict the least recently used pair
+
+    def stats(self):
+        return {"size": len(self.pairs), "hits": self.hits, "near_hits": self.near_hits, "misses": self.misses}
+
+
+class FibManager(BaseManager):
+    pass
+
+
+FibManager.register("FibCache", FibCache)
+
+
+_shared = None               # proxy to the cache of the manager server, set by init_worker
+_local = FibCache(LOCAL_SIZE)
+
+
+def init_worker(shared_cache):
+    """Pool initializer: give every worker the proxy of the shared cache."""
+    global _shared, _local
+    _shared = shared_cache
+    _local = FibCache(LOCAL_SIZE)
+
+
+def fibonacci(n):
+    """Drop-in pool target: (n, F(n)), served from the local cache, then the shared one, then computed."""
+    found = _local.lookup(n)
+    if found is None and _shared is not None:
+        found = _shared.lookup(n)
+        if found is not None:
+            _local.store(*found)
+    if found is None:
+        a, b = fib_pair(n)
+        if _shared is not None:
+            _shared.store(n, a, b)
+    else:
+        a, b = walk(*found, n)
+    _local.store(n, a, b)
+    return (n, a)
+
+
+def local_stats():
+    """Counters of the calling process' local cache (use pool.map(local_stats, ...) to collect them)."""
+    return _local.stats()
+
+
+if __name__ == "__main__":
+    indexes = [random.randint(0, 100) for i in range(100_000)]
+    large = [random.randint(200_000, 200_100) for i in range(200)]
+
+    start = time.perf_counter()
+    expected = [fast_fibonacci(n) for n in indexes]
+    print("Fast doubling, no cache:", time.perf_counter() - start)
+
+    with FibManager() as manager:
+        cache = manager.FibCache(1024)
+        with multiprocessing.Pool(processes=4, initializer=init_worker, initargs=(cache,)) as pool:
+            start = time.perf_counter()
+            assert pool.map(fibonacci, indexes) == expected
+            print("Pool with cache, small indexes:", time.perf_counter() - start)
+
+            start = time.perf_counter()
+            pool.map(fast_fibonacci, large, chunksize=1)
+            print("Pool without cache, large indexes:", time.perf_counter() - start)
+            start = time.perf_counter()
+            pool.map(fibonacci, large, chunksize=1)
+            print("Pool with cache, large indexes:", time.perf_counter() - start)
+
+        print("Shared cache:", cache.stats())
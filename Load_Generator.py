@@ -0,0 +1,281 @@
+"""
+LOAD GENERATOR & LATENCY HISTOGRAM
+----------------------------------
+The only clients of the socket servers (SOCKETS_Intro.py / TD3.py echo servers, TD5 time server)
+are interactive: input() in a loop. This tool is a headless client instead:
+- it opens N concurrent connections (asyncio, so thousands of connections cost a single thread),
+- every connection sends requests at a configurable rate and message size,
+- the latency of every request goes into an HDR-style histogram, and the tool reports
+  p50/p99/p999 and the throughput.
+
+With --pipeline N, N requests leave at once and every reply is timed on its own, from the send to its arrival.
+With --rate, latency is measured from the time a request was *scheduled* to leave, not from when it actually
+left: if the server stalls, the requests that should have gone out meanwhile count the stall too
+(otherwise the client, waiting, would hide it: "coordinated omission").
+
+HDR-style histogram: values are counted in buckets whose width grows with the value, so that every
+bucket has the same *relative* precision (2**-SUB_BITS, about 1.5% by default) whatever the latency,
+from microseconds to seconds, in a few kilobytes of memory.
+
+Every server of the repo has a localhost stand-in (see SERVERS) so the tool can start it by itself:
+    python Load_Generator.py echo-process --connections 100 --rate 200 --size 64
+    python Load_Generator.py echo-selectors --connections 1000
+    python Load_Generator.py time-threadpool --connections 8
+    python Load_Generator.py time-asyncio --connections 100 --pipeline 16
+Pass --no-stand-in (and --port) to load a server that is already running.
+"""
+import time
+import socket
+import asyncio
+import argparse
+import multiprocessing
+
+import Echo_Selectors
+import Time_Asyncio
+
+HOST = "localhost"
+
+
+class Histogram:
+    """
+    HDR-style latency histogram: values (in microseconds) go into log-linear buckets,
+    2**SUB_BITS buckets per power of two.
+    """
+    SUB_BITS = 6
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.max = 0
+        self.errors = 0     # failed requests, reported next to the latencies
+
+    def _index(self, value):
+        # values below 2**(SUB_BITS+1) have their own bucket, above that a bucket is 2**exponent wide
+        value = max(int(value), 0)
+        exponent = max(value.bit_length() - self.SUB_BITS - 1, 0)
+        return (exponent << self.SUB_BITS) + (value >> exponent)
+
+    def _lowest(self, index):
+        """Smallest value counted in bucket `index`."""
+        if index < 2 << self.SUB_BITS:
+            return index
+        exponent = (index >> self.SUB_BITS) - 1
+        return (index - (exponent << self.SUB_BITS)) << exponent
+
+    def record(self, seconds):
+        us = seconds * 1e6
+        i = self._index(us)
+        self.counts[i] = self.counts.get(i, 0) + 1
+        self.total += 1
+        self.max = max(self.max, us)
+
+    def record_error(self, count=1):
+        self.errors += count
+
+    def merge(self, other):
+        for i, c in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + c
+        self.total += other.total
+        self.errors += other.errors
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """Value in microseconds below which p percent of the recorded values fall."""
+        if not self.total:
+            return 0.0
+        rank = max(1, round(p / 100 * self.total))
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= rank:
+                return min(self._lowest(i + 1), self.max)    # upper edge of the bucket
+        return self.max
+
+
+# Protocols: send `count` requests at once (pipelining), then wait for their `count` replies;
+# return the arrival time of every reply
+async def echo_requests(reader, writer, message, count):
+    writer.write(message * count)
+    done = []
+    for _ in range(count):
+        await reader.readexactly(len(message))
+        done.append(time.perf_counter())
+    return done
+
+
+async def time_requests(reader, writer, message, count):
+    writer.write(b"time\n" * count)
+    done = []
+    for _ in range(count):
+        if not await reader.readline():
+            raise ConnectionError("connection closed by the server")
+        done.append(time.perf_counter())
+    return done
+
+
+async def run_connection(host, port, request, message, rate, duration, pipeline, histogram):
+    """
+    One client: send requests at `rate` per second (0 = as fast as possible) during `duration` seconds.
+    If the connection fails, the requests in flight are counted as errors and the client stops.
+    """
+    interval = pipeline / rate if rate else 0
+    deadline = time.perf_counter() + duration
+    next_send = time.perf_counter()
+    writer = None
+    in_flight = 1   # the first request, until the connection is open
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        in_flight = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if interval:
+                delay = next_send - start
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                start = next_send      # late or not, the requests were due at next_send
+                next_send += interval
+            in_flight = pipeline
+            for done in await request(reader, writer, message, pipeline):
+                histogram.record(done - start)
+            in_flight = 0
+    except (ConnectionError, asyncio.IncompleteReadError, OSError):
+        histogram.record_error(in_flight)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def one_shot_time_request(host, port, histogram, rate, duration):
+    """TD5 thread-pool time server: one request per connection, reply read until the server closes."""
+    interval = 1 / rate if rate else 0
+    deadline = time.perf_counter() + duration
+    next_send = time.perf_counter()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        if interval:
+            delay = next_send - start
+            if delay > 0:
+                await asyncio.sleep(delay)
+            start = next_send
+            next_send += interval
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b"time")
+            await reader.read()
+            writer.close()
+        except OSError:
+            histogram.record_error()
+            continue
+        histogram.record(time.perf_counter() - start)
+
+
+async def generate_load(host, port, protocol, connections, rate, size, duration, pipeline):
+    histogram = Histogram()
+    message = b"x" * size
+    if protocol == "time-oneshot":
+        clients = [one_shot_time_request(host, port, histogram, rate, duration) for _ in range(connections)]
+    else:
+        request = echo_requests if protocol == "echo" else time_requests
+        clients = [run_connection(host, port, request, message, rate, duration, pipeline, histogram)
+                   for _ in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*clients)
+    return histogram, time.perf_counter() - start
+
+
+def handle_client(client_socket):
+    """Child of echo_process_server (module level, so that it also works with the spawn and forkserver methods)."""
+    with client_socket:
+        data = client_socket.recv(1024)
+        while len(data):
+            client_socket.sendall(data)
+            data = client_socket.recv(1024)
+
+
+def echo_process_server(host, port):
+    """Stand-in of the TD3 Ex2 echo server: one process per client."""
+    import signal
+    from multiprocessing import Process
+
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)    # let the kernel reap the finished children
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_socket.bind((host, port))
+        server_socket.listen(128)
+        while True:
+            client_socket, address = server_socket.accept()
+            process = Process(target=handle_client, args=(client_socket,))
+            process.start()
+            client_socket.close()
+
+
+def echo_single_server(host, port):
+    """Stand-in of the SOCKETS_Intro.py echo server, looping on accept: one client at a time."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_socket.bind((host, port))
+        server_socket.listen(128)
+        while True:
+            client_socket, address = server_socket.accept()
+            with client_socket:
+                data = client_socket.recv(1024)
+                while len(data):
+                    client_socket.sendall(data)
+                    data = client_socket.recv(1024)
+
+
+def echo_selectors_server(host, port):
+    Echo_Selectors.EchoServer(host, port).serve_forever()
+
+
+# server name -> (stand-in target, protocol, default port)
+SERVERS = {
+    "echo-single": (echo_single_server, "echo", 6666),
+    "echo-process": (echo_process_server, "echo", 6666),
+    "echo-selectors": (echo_selectors_server, "echo", 6666),
+    "time-threadpool": (Time_Asyncio.run_threadpool_server, "time-oneshot", 1789),
+    "time-asyncio": (Time_Asyncio.run_asyncio_server, "time", 1789),
+}
+
+
+def report(name, histogram, elapsed):
+    print(f"{name}: {histogram.total} requests in {elapsed:.2f} s, {histogram.total / elapsed:,.0f} req/s")
+    for p in (50, 90, 99, 99.9):
+        print(f"  p{p:<5} {histogram.percentile(p):10.0f} us")
+    print(f"  max    {histogram.max:10.0f} us")
+    print(f"  errors {histogram.errors:10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless load generator for the socket servers of the repo")
+    parser.add_argument("server", choices=list(SERVERS))
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=0, help="requests per second per connection, 0 = unlimited")
+    parser.add_argument("--size", type=int, default=64, help="message size for the echo servers")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--pipeline", type=int, default=1, help="requests in flight per connection")
+    parser.add_argument("--no-stand-in", action="store_true", help="load an already running server")
+    args = parser.parse_args(argv)
+
+    target, protocol, default_port = SERVERS[args.server]
+    port = args.port or default_port
+    process = None
+    if not args.no_stand_in:
+        Echo_Selectors.raise_fd_limit()
+        process = multiprocessing.Process(target=target, args=(args.host, port))
+        process.start()
+        Time_Asyncio.wait_for_server(args.host, port)
+    try:
+        histogram, elapsed = asyncio.run(generate_load(args.host, port, protocol, args.connections, args.rate,
+                                                       args.size, args.duration, args.pipeline))
+        report(args.server, histogram, elapsed)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+BATCHED SYSTEM V MESSAGE QUEUE PROTOCOL
+---------------------------------------
+The sysv_ipc time servers of TD2.py and MessagePassing_Intro.py handle exactly one message per mq.receive()
+and send one message per reply, each carrying an ASCII-encoded integer or string.
+Every message costs two system calls (msgsnd + msgrcv), so under many clients the server spends its time in the kernel.
+
+This protocol packs many requests or replies into one message, up to the maximum message size,
+with a compact binary encoding through struct:
+
+    request frame (type 1):  pid:int32 | count:uint16 | count x seq:uint32
+    reply frame (type pid+3): pid:int32 | count:uint16 | count x (seq:uint32, time:float64)
+    termination (type 2):    empty
+
+- A client sends its time requests by frames (as many as one reply frame can answer); seq numbers let it
+  match the replies.
+- Replies go back on type pid + 3 (like the TD5 client) so that concurrent clients never steal each other's replies.
+  (With TD2's shared type 3, batched replies would be mixed between clients.)
+- The server blocks for the first message, then drains the queue with block=False, processing everything
+  already queued before blocking again. All the replies of one client in that drain leave in as few frames as possible.
+  It reads with type=-2 (lowest type <= 2) so that it never picks up a reply meant for a client.
+
+    python MessageQueue_Batch.py benchmark    # messages per second, one message per request vs batched
+"""
+import os
+import sys
+import time
+import struct
+import multiprocessing
+
+import sysv_ipc
+
+key = 128
+
+MAX_MESSAGE = 2048              # sysv_ipc refuses longer messages (its default build limit, below Linux's msgmax)
+FRAME = struct.Struct("<iH")    # pid, count
+SEQ = struct.Struct("<I")
+REPLY = struct.Struct("<Id")    # seq, time.time()
+
+TIME_REQUEST = 1
+TERMINATE = 2
+REPLY_BASE = 3                  # replies to client pid go on type pid + 3
+
+
+def max_message(mq):
+    return min(mq.max_size, MAX_MESSAGE)
+
+
+def frame_capacity(record, max_size):
+    """Number of records of the `record` Struct that fit in one frame."""
+    return (max_size - FRAME.size) // record.size
+
+
+def pack_frames(pid, records, record, max_size):
+    """Pack records (tuples for the `record` Struct) into as few frames as max_size allows."""
+    per_frame = frame_capacity(record, max_size)
+    frames = []
+    for i in range(0, len(records), per_frame):
+        chunk = records[i:i + per_frame]
+        frame = bytearray(FRAME.size + len(chunk) * record.size)
+        FRAME.pack_into(frame, 0, pid, len(chunk))
+        offset = FRAME.size
+        for r in chunk:
+            record.pack_into(frame, offset, *r)
+            offset += record.size
+        frames.append(bytes(frame))
+    return frames
+
+
+def unpack_frame(message, record):
+    """(pid, [records]) of a frame; ValueError if its length does not match its count, or its pid is invalid."""
+    if len(message) < FRAME.size:
+        raise ValueError(f"frame of {len(message)} bytes is shorter than its header")
+    pid, count = FRAME.unpack_from(message)
+    if len(message) != FRAME.size + count * record.size:
+        raise ValueError(f"frame of {len(message)} bytes does not hold {count} records")
+    if pid <= 0:
+        raise ValueError(f"invalid pid {pid}")
+    return pid, list(record.iter_unpack(message[FRAME.size:]))
+
+
+def serve(mq):
+    """Batched time server: returns when a termination request arrives."""
+    max_size = max_message(mq)
+    while True:
+        # Block for the first message, then take everything already queued
+        messages = [mq.receive(type=-TERMINATE)]
+        while True:
+            try:
+                messages.append(mq.receive(block=False, type=-TERMINATE))
+            except sysv_ipc.BusyError:
+                break
+
+        now = time.time()        # one clock read serves every request of the drain
+        replies = {}
+        terminate = False
+        for message, msg_type in messages:
+            if msg_type == TERMINATE:
+                terminate = True
+                continue
+            try:
+                pid, seqs = unpack_frame(message, SEQ)
+            except ValueError as e:     # malformed request (e.g. another protocol's client): skip it
+                print(f"skipping malformed frame: {e}", file=sys.stderr)
+                continue
+            replies.setdefault(pid, []).extend((seq, now) for (seq,) in seqs)
+
+        for pid, records in replies.items():
+            for frame in pack_frames(pid, records, REPLY, max_size):
+                mq.send(frame, type=pid + REPLY_BASE)
+        if terminate:
+            return
+
+
+def request_times(mq, count, pid=None):
+    """
+    Client: ask for `count` times in as few messages as possible; returns [(seq, time)] in seq order.
+    At most one reply frame worth of requests is in flight: the queue holds a few kilobytes only, and a client
+    blocked in send() while the server is blocked sending it replies would deadlock both.
+    """
+    pid = pid or os.getpid()
+    max_size = max_message(mq)
+    window = frame_capacity(REPLY, max_size)
+    replies = []
+    for first in range(0, count, window):
+        seqs = range(first, min(first + window, count))
+        for frame in pack_frames(pid, [(seq,) for seq in seqs], SEQ, max_size):
+            mq.send(frame, type=TIME_REQUEST)
+        expected = len(replies) + len(seqs)
+        while len(replies) < expected:
+            message, _ = mq.receive(type=pid + REPLY_BASE)
+            replies.extend(unpack_frame(message, REPLY)[1])
+    return sorted(replies)
+
+
+def terminate(mq):
+    mq.send(b"", type=TERMINATE)
+
+
+# --- one message per request, for comparison ----------------------------------
+
+def serve_plain(mq):
+    """TD2-style server, one receive and one send per request (replies routed per pid so clients can coexist)."""
+    while True:
+        message, msg_type = mq.receive(type=-TERMINATE)
+        if msg_type == TERMINATE:
+            return
+        pid = int(message.decode())
+        mq.send(time.asctime().encode(), type=pid + REPLY_BASE)
+
+
+def request_times_plain(mq, count):
+    pid = os.getpid()
+    m = str(pid).encode()
+    for _ in range(count):
+        mq.send(m, type=TIME_REQUEST)
+        mq.receive(type=pid + REPLY_BASE)
+
+
+def _client(client, mq, count, barrier):
+    barrier.wait()
+    client(mq, count)
+
+
+def benchmark(clients=8, requests=5000):
+    for name, server, client in [("one message per request", serve_plain, request_times_plain),
+                                 ("batched frames", serve, request_times)]:
+        mq = sysv_ipc.MessageQueue(None, sysv_ipc.IPC_CREX)    # private key for the benchmark
+        try:
+            server_process = multiprocessing.Process(target=server, args=(mq,))
+            server_process.start()
+            barrier = multiprocessing.Barrier(clients + 1)
+            client_processes = [multiprocessing.Process(target=_client, args=(client, mq, requests, barrier))
+                                for _ in range(clients)]
+            for p in client_processes:
+                p.start()
+            barrier.wait()
+            start = time.perf_counter()
+            for p in client_processes:
+                p.join()
+            seconds = time.perf_counter() - start
+            terminate(mq)
+            server_process.join()
+        finally:
+            mq.remove()
+        print(f"{name:<25} {clients} clients x {requests} requests: {seconds:.3f} s, "
+              f"{clients * requests / seconds:,.0f} requests/s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        benchmark()
+    else:
+        mq = sysv_ipc.MessageQueue(key, sysv_ipc.IPC_CREAT)
+        print("Batched time server listening on key", key)
+        try:
+            serve(mq)
+        finally:
+            mq.remove()
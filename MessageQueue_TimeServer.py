@@ -0,0 +1,133 @@
+"""
+MULTI-THREADED SYSV_IPC TIME SERVER WITH PER-CLIENT REPLIES
+-----------------------------------------------------------
+In TD2.py the server replies with type=3 to everyone: when several clients wait at the same time,
+any of them may receive the reply meant for another one. The message queue client of TD5 Ex2 already
+expects a better protocol, that no server of the repo implemented until now:
+- a time request is a message of type 1 whose content is the client PID (str(pid).encode()),
+- the reply is sent with type pid + 3, so every client only receives its own replies (receive(type=pid + 3)),
+- a message of type 2 asks the server to terminate.
+
+This server reads the requests in the main thread and hands every one of them to a thread pool,
+as in TD5 Ex2; the handler reads the clock and sends the reply on the client's own type.
+A request without a valid PID cannot be answered (there is no reply type for it): it is reported and skipped.
+It reads with type=-2 (lowest type <= 2) so that it never picks up a reply waiting for a client.
+
+    python MessageQueue_TimeServer.py             # serve on key 666, for the TD5 client
+    python MessageQueue_TimeServer.py benchmark   # throughput with 1, 2, 4, 8 and 16 concurrent clients
+"""
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import sysv_ipc
+
+from MessageQueue_Batch import TIME_REQUEST, TERMINATE, REPLY_BASE
+
+key = 666
+
+
+def parse_request(message):
+    """
+    PID of the client of a time request; ValueError if the message is not a positive decimal PID.
+
+    >>> parse_request(b"4242")
+    4242
+    >>> parse_request(b"time")
+    Traceback (most recent call last):
+    ValueError: malformed time request b'time'
+    """
+    try:
+        pid = int(message.decode("ascii"))
+    except ValueError:      # UnicodeDecodeError included
+        raise ValueError(f"malformed time request {message[:32]!r}") from None
+    if pid <= 0:
+        raise ValueError(f"invalid pid {pid} in time request")
+    return pid
+
+
+def handle_request(mq, pid):
+    current_time = time.asctime()
+    mq.send(current_time.encode(), type=pid + REPLY_BASE)
+
+
+def report_failure(future):
+    """Done-callback: nobody waits for the futures of the pool, so an error in a handler is printed here."""
+    if future.exception() is not None:
+        print(f"time request failed: {future.exception()!r}", file=sys.stderr)
+
+
+def serve(mq, workers=4):
+    with ThreadPoolExecutor(max_workers=workers) as thread_pool:
+        while True:
+            message, msg_type = mq.receive(type=-TERMINATE)
+            if msg_type == TERMINATE:
+                break
+            try:
+                pid = parse_request(message)
+            except ValueError as e:     # no PID, so no reply type: the request can only be skipped
+                print(f"skipping {e}", file=sys.stderr)
+                continue
+            thread_pool.submit(handle_request, mq, pid).add_done_callback(report_failure)
+    # leaving the with block waits for the requests still in the pool
+
+
+def request_time(mq, pid=None):
+    """The TD5 client request: returns the server's reply for this process only."""
+    pid = pid or os.getpid()
+    mq.send(str(pid).encode(), type=TIME_REQUEST)
+    m, t = mq.receive(type=pid + REPLY_BASE)
+    return m.decode()
+
+
+def _client(mq, requests, barrier, received):
+    pid = os.getpid()
+    barrier.wait()
+    count = 0
+    for _ in range(requests):
+        request_time(mq, pid)
+        count += 1
+    received.put((pid, count))
+
+
+def benchmark(client_counts=(1, 2, 4, 8, 16), requests=2000, workers=4):
+    print(f"{'clients':>7} {'seconds':>8} {'requests/s':>11}  replies")
+    for clients in client_counts:
+        mq = sysv_ipc.MessageQueue(None, sysv_ipc.IPC_CREX)
+        try:
+            server_process = multiprocessing.Process(target=serve, args=(mq, workers))
+            server_process.start()
+            barrier = multiprocessing.Barrier(clients + 1)
+            received = multiprocessing.Queue()
+            client_processes = [multiprocessing.Process(target=_client, args=(mq, requests, barrier, received))
+                                for _ in range(clients)]
+            for p in client_processes:
+                p.start()
+            barrier.wait()
+            start = time.perf_counter()
+            counts = [received.get() for _ in client_processes]
+            seconds = time.perf_counter() - start
+            for p in client_processes:
+                p.join()
+            mq.send(b"", type=TERMINATE)
+            server_process.join()
+            # Every client got exactly its own replies and nothing is left over in the queue
+            ok = all(count == requests for pid, count in counts) and mq.current_messages == 0
+        finally:
+            mq.remove()
+        print(f"{clients:>7} {seconds:>8.3f} {clients * requests / seconds:>11,.0f}  "
+              f"{'all routed to their client' if ok else 'MISROUTED'}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        benchmark()
+    else:
+        mq = sysv_ipc.MessageQueue(key, sysv_ipc.IPC_CREAT)
+        print("Time server listening on key", key)
+        try:
+            serve(mq)
+        finally:
+            mq.remove()
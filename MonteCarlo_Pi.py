@@ -0,0 +1,109 @@
+"""
+VECTORIZED MONTE CARLO π
+------------------------
+In TD4 Ex1 the worker thread draws one point at a time with random.random() and takes the lock
+for every point that falls in the circle. With 10 million points almost all the time is spent in the
+interpreter loop and on lock acquisition, not on the maths.
+
+This engine removes both costs:
+1- Points are generated by blocks with NumPy: one call produces a whole array of x and one of y,
+   and the test x**2 + y**2 <= 1 is done on the whole block at once.
+2- Every worker keeps its own local counter of hits. Nothing is shared while counting,
+   so no lock is needed. The partial counts are merged only once, at the end.
+3- Blocks can be spread over a multiprocessing.Pool so the estimate scales with the number of cores.
+   Every task gets its own independent random stream (SeedSequence.spawn) so that
+   workers never generate the same points.
+
+Run it to compare the points per second of the TD4 single-thread/lock version with this engine:
+    python MonteCarlo_Pi.py 10000000
+"""
+import sys
+import time
+import threading
+import multiprocessing
+
+import numpy as np
+
+BLOCK_SIZE = 1 << 20    # points generated per NumPy call (2 arrays of 8 MB)
+
+
+def count_in_circle(n, seed=None, block_size=BLOCK_SIZE):
+    """Count how many of n random points of [0,1)x[0,1) fall in the circle of radius 1."""
+    rng = np.random.default_rng(seed)
+    hits = 0    # local counter: nobody else touches it, so no lock
+    remaining = n
+    while remaining > 0:
+        size = min(block_size, remaining)
+        x = rng.random(size)
+        y = rng.random(size)
+        hits += int(np.count_nonzero(x * x + y * y <= 1.0))
+        remaining -= size
+    return hits
+
+
+def _count_task(task):
+    # Pool workers receive a single argument: unpack (n, seed, block_size)
+    return count_in_circle(*task)
+
+
+def split_points(total_points, tasks):
+    """Split total_points into `tasks` nearly equal parts."""
+    q, r = divmod(total_points, tasks)
+    return [q + (1 if i < r else 0) for i in range(tasks)]
+
+
+def estimate_pi(total_points, processes=1, block_size=BLOCK_SIZE, seed=None):
+    """
+    Estimate π with total_points random points.
+    - processes=1 counts in the calling process.
+    - processes>1 (or None for os.cpu_count()) spreads the blocks over a process pool.
+    Returns (pi_estimate, points_in_circle).
+    """
+    if total_points <= 0:
+        raise ValueError("total_points must be positive")
+
+    if processes == 1:
+        hits = count_in_circle(total_points, seed, block_size)
+    else:
+        processes = processes or multiprocessing.cpu_count()
+        # A few tasks per worker so that a slow worker does not hold back the whole estimate,
+        # but never tasks smaller than a block.
+        tasks = max(1, min(processes * 4, -(-total_points // block_size)))
+        seeds = np.random.SeedSequence(seed).spawn(tasks)
+        work = [(n, s, block_size) for n, s in zip(split_points(total_points, tasks), seeds)]
+        with multiprocessing.Pool(processes=processes) as pool:
+            hits = sum(pool.imap_unordered(_count_task, work))    # merge the local counters once
+
+    return 4 * hits / total_points, hits
+
+
+def lock_version(total_points):
+    """The original TD4 Ex1 program: one thread, random.random() and a lock per hit."""
+    import TD4
+    TD4.total_points = total_points
+    TD4.points_in_circle = 0
+    worker_thread = threading.Thread(target=TD4.generate_points)
+    worker_thread.start()
+    worker_thread.join()
+    return 4 * TD4.points_in_circle / total_points
+
+
+def report(total_points, processes=None):
+    """Time every method on total_points points and print the points per second of each."""
+    processes = processes or multiprocessing.cpu_count()
+    methods = [
+        ("TD4 thread + lock", lambda: lock_version(total_points)),
+        ("NumPy blocks, 1 process", lambda: estimate_pi(total_points, 1)[0]),
+        (f"NumPy blocks, pool of {processes}", lambda: estimate_pi(total_points, processes)[0]),
+    ]
+    print(f"{'method':<30} {'seconds':>10} {'points/s':>14} {'estimate':>10}")
+    for name, method in methods:
+        start = time.perf_counter()
+        pi_estimate = method()
+        seconds = time.perf_counter() - start
+        print(f"{name:<30} {seconds:>10.3f} {total_points / seconds:>14,.0f} {pi_estimate:>10.6f}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    report(n)
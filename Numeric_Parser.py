@@ -0,0 +1,136 @@
+"""
+FAST NUMERIC STDIN PARSER
+-------------------------
+stat_main() in TD4 Ex2 parses its input with sys.stdin.read().split() and a Python-level float(s) in a
+try/except for every token. On large files this is the main bottleneck, and memory peaks at the whole text,
+plus a list of token strings, plus a list of Python floats (each an object of 24 bytes).
+
+This parser reads sys.stdin.buffer (bytes, no decoding) in large blocks and converts a whole block at once
+with numpy.fromstring(block, sep=" "), which parses in C straight into a float64 array. Only a block that
+contains a bad token falls back to token-by-token parsing, to report every bad token with its byte offset and
+its index among the tokens. A number cut by the end of a block is carried over to the next one.
+
+The parsed values end up in a single read-only NumPy array. The stat workers of TD4 all receive a reference
+to that same array, so no copy is made to hand the data over (threads share memory).
+
+    python Numeric_Parser.py < data.txt
+"""
+import re
+import sys
+import threading
+import warnings
+from queue import Queue
+from array import array
+
+import numpy as np
+
+from TD4 import worker
+
+BLOCK_SIZE = 1 << 24        # bytes read from stdin at a time
+TOKEN = re.compile(rb"\S+")
+WHITESPACE = (b" ", b"\n", b"\t", b"\r", b"\f", b"\v")
+
+
+def parse_block(block, offset=0, index=0):
+    """
+    Parse a block of bytes holding whole tokens.
+    offset/index are the byte offset and token index of the block in the whole input, used to report bad tokens.
+    Returns (float64 array, [(bad token, byte offset, token index)]).
+
+    >>> parse_block(b"1 2.5\\n-3")[0].tolist()
+    [1.0, 2.5, -3.0]
+    >>> parse_block(b" \\n")[0].size      # fromstring would give [-1.0]
+    0
+    >>> parse_block(b"1 x 2")[1]
+    [('x', 2, 1)]
+    """
+    if not block.strip():
+        return np.empty(0), []
+    with warnings.catch_warnings():
+        # fromstring only warns when it stops on unmatched data: make that an error to detect it
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return np.fromstring(block, sep=" "), []
+        except (DeprecationWarning, ValueError):
+            pass
+
+    # Slow path, only for blocks with bad tokens
+    values = array('d')
+    bad = []
+    for i, match in enumerate(TOKEN.finditer(block)):
+        try:
+            values.append(float(match.group()))
+        except ValueError:
+            bad.append((match.group().decode(errors="replace"), offset + match.start(), index + i))
+    return np.frombuffer(values, dtype=np.float64), bad
+
+
+def split_blocks(stream, block_size=BLOCK_SIZE):
+    """Yield (block, byte offset) with blocks cut on whitespace, so that no token is split."""
+    rest = b""
+    offset = 0
+    while True:
+        data = stream.read(block_size)
+        if not data:
+            break
+        data = rest + data
+        # cut after the last whitespace of the data, keep what follows for the next block
+        cut = max(data.rfind(c) for c in WHITESPACE) + 1
+        if cut:
+            yield data[:cut], offset
+            offset += cut
+        rest = data[cut:]
+    if rest:
+        yield rest, offset
+
+
+def parse_stream(stream, block_size=BLOCK_SIZE, on_error=None):
+    """Parse a binary stream of whitespace-separated numbers into one read-only float64 array."""
+    parts = []
+    index = 0
+    for block, offset in split_blocks(stream, block_size):
+        values, bad = parse_block(block, offset, index)
+        index += len(values) + len(bad)
+        for token, position, token_index in bad:
+            if on_error:
+                on_error(token, position, token_index)
+        parts.append(values)
+    data = parts[0] if len(parts) == 1 else np.concatenate(parts) if parts else np.empty(0)
+    data.flags.writeable = False    # shared by every worker: nobody may modify it
+    return data
+
+
+def stdev(data):
+    return data.std(ddof=1)     # sample standard deviation, like statistics.stdev
+
+
+def stat_main(stream=None):
+    data = parse_stream(stream or sys.stdin.buffer,
+                        on_error=lambda token, position, index:
+                        print(f"bad number: {token} (token #{index}, byte {position})"))
+
+    # If no valid data is entered, exit early
+    if not len(data):
+        print("No valid data entered.")
+        return
+
+    # Vectorized versions of the TD4 operations
+    operations = [np.min, np.max, np.median, np.mean, stdev]
+
+    # One queue per worker, each receiving a reference to the same array
+    threads = []
+    for operation in operations:
+        data_queue = Queue()
+        thread = threading.Thread(target=worker, args=(data_queue, operation))
+        thread.start()
+        threads.append((thread, data_queue))
+
+    for thread, data_queue in threads:
+        data_queue.put(data)
+        data_queue.put(None)    # sentinel: the worker stops after this array
+    for thread, data_queue in threads:
+        thread.join()
+
+
+if __name__ == "__main__":
+    stat_main()
@@ -0,0 +1,167 @@
+"""
+PARTITIONED PARALLEL UPDATE OF A SHARED ARRAY
+---------------------------------------------
+In SharingState_Intro.py a single child touches the whole shared vector. With NumPy views (SharedArray_NumPy.py)
+that child is fast, but it still uses a single core.
+
+PartitionedPool splits a large shared buffer (Array/RawArray or SharedNDArray) into disjoint slices, one per worker
+process, and keeps the workers alive between operations:
+- apply(kernel, *args) sends the kernel to every worker, each worker runs kernel(its_slice, *args) in place;
+- slices are disjoint, so no lock is needed; their bounds are aligned on 64-byte cache lines so that two workers
+  never write into the same cache line (false sharing);
+- completion is signalled by a multiprocessing.Barrier shared by the workers and the parent: the parent returns
+  from apply() when every worker has reached the barrier, i.e. when the whole array is updated;
+- a watchdog thread waits on the workers' sentinels: if a worker exits while the pool is open (os._exit, killed
+  by the OOM killer...), it aborts the barrier, and apply() raises instead of waiting forever for it.
+
+Kernels must be module-level functions (they are pickled to the workers), e.g. negate and scale below.
+
+    python Partitioned_Update.py 100000000     # elements/s for 1, 2, 4... workers on 100M int32
+"""
+import os
+import sys
+import time
+import threading
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from SharedArray_NumPy import SharedNDArray, as_array
+
+CACHE_LINE = 64
+
+
+def negate(v):
+    np.negative(v, out=v)
+
+
+def scale(v, factor):
+    np.multiply(v, factor, out=v, casting="unsafe")
+
+
+def crash(v, code=1):
+    """Kernel killing its worker without any cleanup, like an OOM kill would."""
+    os._exit(code)
+
+
+def partition(length, parts, itemsize):
+    """Bounds of `parts` contiguous slices covering range(length), aligned on cache lines."""
+    align = max(CACHE_LINE // itemsize, 1)
+    bounds = [min(round(length * i / parts / align) * align, length) for i in range(parts + 1)]
+    bounds[-1] = length
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def view(shared):
+    return shared.array if isinstance(shared, SharedNDArray) else as_array(shared)
+
+
+def _worker(shared, start, end, tasks, done, errors):
+    v = view(shared).reshape(-1)[start:end]
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        kernel, args = task
+        try:
+            kernel(v, *args)
+        except Exception:
+            errors.put(traceback.format_exc())
+        try:
+            done.wait()     # completion signal: the parent waits on the same barrier
+        except threading.BrokenBarrierError:    # another worker died: the pool is unusable
+            break
+
+
+class PartitionedPool:
+    """
+    Worker processes updating disjoint slices of a shared array.
+
+    A worker dying during an operation makes apply() raise, instead of waiting for it forever:
+
+    >>> shared = SharedNDArray(1000, np.int32)
+    >>> with PartitionedPool(shared, 2) as pool:
+    ...     pool.apply(crash)     # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    RuntimeError: worker exited during the operation (exit codes [...])
+    >>> shared.close(); shared.unlink()
+    """
+    def __init__(self, shared, processes=None):
+        self.shared = shared
+        self.processes = processes or os.cpu_count()
+        array = view(shared)
+        slices = partition(array.size, self.processes, array.itemsize)
+        self.done = multiprocessing.Barrier(self.processes + 1)
+        self.errors = multiprocessing.SimpleQueue()    # put() is synchronous: visible before the barrier
+        self.tasks = [multiprocessing.SimpleQueue() for _ in slices]
+        self.workers = [multiprocessing.Process(target=_worker,
+                                                args=(shared, start, end, tasks, self.done, self.errors),
+                                                daemon=True)
+                        for (start, end), tasks in zip(slices, self.tasks)]
+        for p in self.workers:
+            p.start()
+        self._closing = False
+        threading.Thread(target=self._watch, daemon=True).start()
+
+    def _watch(self):
+        """Break the barrier as soon as a worker exits while the pool is open, so that nobody waits for it."""
+        wait([p.sentinel for p in self.workers])
+        if not self._closing:
+            self.done.abort()
+
+    def apply(self, kernel, *args):
+        """Run kernel(slice, *args) on every slice in parallel and wait until all are done."""
+        for tasks in self.tasks:
+            tasks.put((kernel, args))
+        try:
+            self.done.wait()
+        except threading.BrokenBarrierError:    # aborted by the watchdog: stop every worker
+            for p in self.workers:
+                p.terminate()
+                p.join()
+            raise RuntimeError(f"worker exited during the operation "
+                               f"(exit codes {[p.exitcode for p in self.workers]})") from None
+        errors = []
+        while not self.errors.empty():
+            errors.append(self.errors.get())
+        if errors:
+            raise RuntimeError(f"kernel failed in {len(errors)} worker(s):\n" + errors[0])
+
+    def close(self):
+        self._closing = True
+        for tasks, p in zip(self.tasks, self.workers):
+            if p.is_alive():
+                tasks.put(None)
+        for p in self.workers:
+            p.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def benchmark(size=100_000_000, repeats=3):
+    shared = SharedNDArray(size, np.int32)
+    shared.array[:] = 1
+    print(f"Negating {size:,} shared int32 in place:")
+    try:
+        for processes in sorted({1, 2, 4, os.cpu_count()}):
+            with PartitionedPool(shared, processes) as pool:
+                pool.apply(negate)      # warm up: pages mapped in every worker
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    pool.apply(negate)
+                seconds = (time.perf_counter() - start) / repeats
+            print(f"  {processes:>3} workers: {seconds:.4f} s, {size / seconds:,.0f} elements/s")
+        assert shared.array[0] in (1, -1)
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000_000)
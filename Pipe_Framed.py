@@ -0,0 +1,189 @@
+"""
+FRAMED PIPE TRANSPORT (TD3 Ex1, at high throughput)
+----------------------------------------------------
+In TD3 Ex1 every phrase costs a full round trip: pipe.send(phrase) pickles it, the child recv()s, unpickles,
+reverses, pickles the reply and sends it back, and the parent waits for that reply before sending the next one.
+Two system calls and two pickles per direction per phrase, plus the latency of a round trip: some tens of
+thousands of phrases per second.
+
+This transport sends phrases in batches, as raw bytes:
+- one frame holds many phrases: a header (number of phrases, size of the text), the length of every phrase
+  (array of uint32, in characters) and all the phrases concatenated in UTF-8. No pickle;
+- frames are sent with send_bytes() and received with recv_bytes_into() into a preallocated buffer, which is
+  only grown when a bigger frame arrives;
+- the child reverses the whole text of the frame at once: reversing a concatenation gives the reversed phrases
+  in the opposite order, reverse(a + b) = reverse(b) + reverse(a), so the reply is the reversed text with the
+  reversed list of lengths;
+- in pipelined mode the parent does not wait for a reply before sending the next frame: a sender thread keeps
+  up to `window` frames in flight while the main thread reads the replies (sending and receiving from the
+  same thread could deadlock once both pipe buffers are full).
+
+An empty frame plays the role of the "end" phrase.
+
+    python Pipe_Framed.py          # benchmark: TD3 round trips vs batched frames vs pipelined frames
+"""
+import sys
+import time
+import struct
+import threading
+import multiprocessing
+from queue import Queue
+from array import array
+from itertools import accumulate, islice
+from multiprocessing.connection import BufferTooShort
+
+HEADER = struct.Struct("=II")      # number of phrases, size of the UTF-8 text in bytes
+BUFFER_SIZE = 1 << 20
+BATCH = 4096
+
+
+class FramedPipe:
+    """send_bytes/recv_bytes_into framing of batches of phrases over a multiprocessing Connection."""
+    def __init__(self, conn, buffer_size=BUFFER_SIZE):
+        self.conn = conn
+        # separate buffers: in pipelined mode one thread sends while another receives
+        self.out = bytearray(buffer_size)
+        self.buffer = bytearray(buffer_size)
+
+    def send_frame(self, lengths, text):
+        """Send one frame: `lengths` an array('I') of phrase lengths, `text` the UTF-8 concatenated phrases."""
+        size = HEADER.size + lengths.itemsize * len(lengths) + len(text)
+        if size > len(self.out):
+            self.out = bytearray(size)
+        buffer = self.out
+        HEADER.pack_into(buffer, 0, len(lengths), len(text))
+        end = HEADER.size + lengths.itemsize * len(lengths)
+        buffer[HEADER.size:end] = lengths
+        buffer[end:size] = text
+        self.conn.send_bytes(buffer, 0, size)
+
+    def send(self, phrases):
+        phrases = list(phrases)
+        self.send_frame(array('I', map(len, phrases)), "".join(phrases).encode())
+
+    def recv_frame(self):
+        """Receive one frame into the buffer: (lengths, text), an empty frame gives ([], "")."""
+        try:
+            self.conn.recv_bytes_into(self.buffer)
+            data = self.buffer
+        except BufferTooShort as e:
+            data = e.args[0]                            # the whole frame, already read
+            self.buffer = bytearray(len(data) * 2)      # large enough next time
+        count, size = HEADER.unpack_from(data)
+        end = HEADER.size + 4 * count
+        lengths = array('I')
+        lengths.frombytes(data[HEADER.size:end])
+        text = bytes(data[end:end + size]).decode()
+        return lengths, text
+
+    def recv(self):
+        lengths, text = self.recv_frame()
+        offsets = list(accumulate(lengths, initial=0))
+        return [text[a:b] for a, b in zip(offsets, offsets[1:])]
+
+    def close(self):
+        self.conn.close()
+
+
+def child_process(pipe):
+    """The TD3 child, one frame at a time: reverse every phrase of the frame, send them back in one frame."""
+    framed = FramedPipe(pipe)
+    while True:
+        lengths, text = framed.recv_frame()
+        if not lengths:     # empty frame: end
+            break
+        lengths.reverse()
+        framed.send_frame(lengths, text[::-1].encode())
+    pipe.close()
+
+
+def reversed_frame(framed):
+    """Receive a reply frame: phrases come back in reverse order, put them back in order."""
+    phrases = framed.recv()
+    phrases.reverse()
+    return phrases
+
+
+def batches(phrases, size):
+    it = iter(phrases)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def reverse_all(framed, phrases, batch=BATCH):
+    """Reverse phrases through the child, one frame at a time (one round trip per frame)."""
+    results = []
+    for chunk in batches(phrases, batch):
+        framed.send(chunk)
+        results.extend(reversed_frame(framed))
+    return results
+
+
+def reverse_all_pipelined(framed, phrases, batch=BATCH, window=4):
+    """Reverse phrases with up to `window` frames in flight: a thread sends while this one receives."""
+    in_flight = threading.Semaphore(window)
+    sent = Queue()
+
+    def sender():
+        for chunk in batches(phrases, batch):
+            in_flight.acquire()
+            framed.send(chunk)
+            sent.put(True)
+        sent.put(None)      # no more frames
+
+    thread = threading.Thread(target=sender)
+    thread.start()
+    results = []
+    while sent.get():
+        results.extend(reversed_frame(framed))
+        in_flight.release()
+    thread.join()
+    return results
+
+
+# --- benchmark ----------------------------------------------------------------
+
+def td3_child_process(pipe):
+    """The original TD3 child: one pickled round trip per phrase."""
+    while True:
+        phrase = pipe.recv()
+        if phrase == "end":
+            break
+        pipe.send(phrase[::-1])
+    pipe.close()
+
+
+def run(kind, phrases):
+    parent_pipe, child_pipe = multiprocessing.Pipe()
+    target = td3_child_process if kind == "td3" else child_process
+    process = multiprocessing.Process(target=target, args=(child_pipe,))
+    process.start()
+    start = time.perf_counter()
+    if kind == "td3":
+        results = []
+        for phrase in phrases:
+            parent_pipe.send(phrase)
+            results.append(parent_pipe.recv())
+        parent_pipe.send("end")
+    else:
+        framed = FramedPipe(parent_pipe)
+        results = (reverse_all if kind == "batched" else reverse_all_pipelined)(framed, phrases)
+        framed.send([])     # end
+    seconds = time.perf_counter() - start
+    process.join()
+    parent_pipe.close()
+    child_pipe.close()
+    assert results == [p[::-1] for p in phrases]
+    return len(phrases) / seconds
+
+
+def benchmark(count=2_000_000):
+    phrases = [f"phrase number {i}, été comme hiver" for i in range(count)]
+    print(f"Reversing phrases through a pipe ({count:,} phrases, {BATCH} per frame):")
+    print(f"  TD3, one round trip per phrase: {run('td3', phrases[:count // 20]):12,.0f} phrases/s")
+    print(f"  batched frames:                 {run('batched', phrases):12,.0f} phrases/s")
+    print(f"  pipelined frames:               {run('pipelined', phrases):12,.0f} phrases/s")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
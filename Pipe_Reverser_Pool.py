@@ -0,0 +1,189 @@
+"""
+POOL OF REVERSER CHILDREN WITH ORDERED REASSEMBLY (TD3 Ex1)
+-----------------------------------------------------------
+TD3 Ex1 (and Pipe_Framed.py) has exactly one child reversing phrases: one core and one pipe at most.
+
+ReverserPool fans the phrases out to N children, in frames of `batch` phrases (the framing of Pipe_Framed.py):
+- mode "pipes": every child has its own Pipe. A frame goes to an idle child; the parent waits for replies on
+  all the pipes at once with multiprocessing.connection.wait(). A child gets at most one frame at a time, so
+  neither side can block on a full pipe while the other does too;
+- mode "queue": the children share one task Queue and one result Queue, the first free child takes the next frame.
+
+Every frame is tagged with a sequence number. Replies come back in any order; the parent keeps early ones
+aside and yields the phrases in input order.
+
+Backpressure: at most `window` frames are past the consumer (sent, being reversed, or waiting to be
+reassembled). reverse() is a generator: phrases are read from the input and sent only as the consumer asks for
+results, so a slow consumer slows the whole pipeline down instead of growing memory.
+
+    python Pipe_Reverser_Pool.py       # benchmark: 1 child vs N children, pipes and queue
+"""
+import os
+import sys
+import time
+import multiprocessing
+from queue import Empty
+from array import array
+from itertools import accumulate
+from multiprocessing.connection import wait
+
+from Pipe_Framed import FramedPipe, child_process, reversed_frame, batches, reverse_all
+
+BATCH = 1024
+
+
+def queue_child(tasks, results):
+    """Queue mode child: reverse the frames of the shared task queue until None."""
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        seq, lengths, text = task
+        lengths.reverse()
+        results.put((seq, lengths, text.decode()[::-1].encode()))
+
+
+def split_reversed(lengths, text):
+    """Phrases of a reply frame, back in their original order."""
+    text = text.decode()
+    offsets = list(accumulate(lengths, initial=0))
+    phrases = [text[a:b] for a, b in zip(offsets, offsets[1:])]
+    phrases.reverse()
+    return phrases
+
+
+class ReverserPool:
+    def __init__(self, processes=None, mode="pipes", batch=BATCH, window=None):
+        if mode not in ("pipes", "queue"):
+            raise ValueError(f"unknown mode: {mode}")
+        self.processes = processes or os.cpu_count()
+        self.mode = mode
+        self.batch = batch
+        self.window = window or 2 * self.processes
+        self.busy = {}      # pipes mode: FramedPipe -> sequence number of the frame its child is reversing
+        if mode == "pipes":
+            pipes = [multiprocessing.Pipe() for _ in range(self.processes)]
+            self.framed = [FramedPipe(parent) for parent, child in pipes]
+            self.children = [multiprocessing.Process(target=child_process, args=(child,)) for parent, child in pipes]
+        else:
+            self.tasks = multiprocessing.Queue()
+            self.results = multiprocessing.Queue()
+            self.children = [multiprocessing.Process(target=queue_child, args=(self.tasks, self.results))
+                             for _ in range(self.processes)]
+        for p in self.children:
+            p.start()
+        if mode == "pipes":
+            for parent, child in pipes:
+                child.close()   # the parent's copy: the child owns it now
+
+    def reverse(self, phrases):
+        """Yield the reversed phrases, in input order."""
+        frames = enumerate(batches(phrases, self.batch))
+        pending = 0     # frames sent, reply not received yet
+        done = {}       # sequence number -> phrases, replies that came back before their turn
+        next_seq = 0
+        exhausted = False
+        while True:
+            # backpressure: no more than `window` frames between the input and the consumer
+            while not exhausted and pending + len(done) < self.window and self._free_child():
+                frame = next(frames, None)
+                if frame is None:
+                    exhausted = True
+                else:
+                    self._send(*frame)
+                    pending += 1
+            if next_seq in done:
+                yield from done.pop(next_seq)
+                next_seq += 1
+            elif pending:
+                for seq, reversed_phrases in self._receive():
+                    done[seq] = reversed_phrases
+                    pending -= 1
+            else:
+                break
+
+    def _free_child(self):
+        return self.mode == "queue" or len(self.busy) < len(self.framed)
+
+    def _send(self, seq, phrases):
+        if self.mode == "pipes":
+            framed = next(framed for framed in self.framed if framed not in self.busy)
+            framed.send(phrases)
+            self.busy[framed] = seq
+        else:
+            self.tasks.put((seq, array('I', map(len, phrases)), "".join(phrases).encode()))
+
+    def _receive(self):
+        """Wait for at least one reply: [(sequence number, phrases)]."""
+        if self.mode == "queue":
+            seq, lengths, text = self.results.get()
+            return [(seq, split_reversed(lengths, text))]
+        by_conn = {framed.conn: framed for framed in self.busy}
+        return [(self.busy.pop(by_conn[conn]), reversed_frame(by_conn[conn])) for conn in wait(list(by_conn))]
+
+    def close(self):
+        # replies of an abandoned reverse() are drained, or a child could stay blocked sending them
+        if self.mode == "pipes":
+            for framed in self.busy:
+                framed.recv()
+            self.busy.clear()
+            for framed in self.framed:
+                framed.send([])     # end
+                framed.close()
+        else:
+            for _ in self.children:
+                self.tasks.put(None)
+            while any(p.is_alive() for p in self.children):
+                try:
+                    self.results.get(timeout=0.1)
+                except Empty:
+                    pass
+        for p in self.children:
+            p.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- benchmark ----------------------------------------------------------------
+
+def run_single(phrases):
+    parent_pipe, child_pipe = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=child_process, args=(child_pipe,))
+    process.start()
+    framed = FramedPipe(parent_pipe)
+    start = time.perf_counter()
+    results = reverse_all(framed, phrases, BATCH)
+    seconds = time.perf_counter() - start
+    framed.send([])
+    process.join()
+    framed.close()
+    return results, seconds
+
+
+def run_pool(phrases, processes, mode):
+    with ReverserPool(processes, mode) as pool:
+        start = time.perf_counter()
+        results = list(pool.reverse(phrases))
+        return results, time.perf_counter() - start
+
+
+def benchmark(count=2_000_000):
+    phrases = [f"phrase number {i}, été comme hiver" * 4 for i in range(count)]
+    expected = [p[::-1] for p in phrases]
+    print(f"Reversing {count:,} phrases, {BATCH} per frame:")
+    results, seconds = run_single(phrases)
+    assert results == expected
+    print(f"  1 child (Pipe_Framed.py):    {count / seconds:12,.0f} phrases/s")
+    for mode in ("pipes", "queue"):
+        for processes in sorted({2, 4, os.cpu_count()}):
+            results, seconds = run_pool(phrases, processes, mode)
+            assert results == expected
+            print(f"  {processes:>2} children, {mode + ':':6}     {count / seconds:12,.0f} phrases/s")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
@@ -0,0 +1,190 @@
+"""
+POOL BENCHMARK HARNESS
+----------------------
+TD5 Ex1 measures pool calls with time.time() around the whole block, prints included, and the measured
+span even contains the final apply_async(time.sleep, (5,)). A single measure like this is not repeatable.
+
+This harness runs the pool examples (is_prime from TD5, fibonacci from Thread&ProcessPools.py) over a matrix of
+- kernels:       is_prime, fibonacci (and fast_fibonacci from Fibonacci_Cache.py)
+- pool kinds:    multiprocessing.Pool apply / map / map_async / imap,
+                 concurrent.futures ThreadPoolExecutor / ProcessPoolExecutor
+- worker counts and input sizes.
+
+For every cell of the matrix:
+1- the pool is created and warmed up (workers started, first task done) outside of the measure,
+2- the same seeded input is run `repeats` times, each run timed with time.perf_counter(),
+3- the median and percentiles of the runs are reported, and everything is written to a JSON file
+   that can be compared with an older one to spot regressions:
+
+    python Pool_Benchmark.py --output bench.json
+    python Pool_Benchmark.py --output new.json --compare bench.json
+"""
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import statistics
+import multiprocessing
+import concurrent.futures
+
+from Prime_Sieve import is_prime_trial
+from Fibonacci_Cache import fast_fibonacci
+
+
+def fibonacci(n):
+    """The Thread&ProcessPools.py fibonacci, without the print."""
+    a, b = 0, 1
+    i = 0
+    while i < n:
+        a, b = b, a+b
+        i += 1
+    return (n, a)
+
+
+# kernel name -> (function, input generator taking a random.Random and a size)
+KERNELS = {
+    "is_prime": (is_prime_trial, lambda rng, size: [rng.randint(10**3, 10**6) for i in range(size)]),
+    "fibonacci": (fibonacci, lambda rng, size: [rng.randint(0, 100) for i in range(size)]),
+    "fast_fibonacci": (fast_fibonacci, lambda rng, size: [rng.randint(0, 100) for i in range(size)]),
+}
+
+
+# Every pool kind is (factory, run): factory(workers) gives a pool usable in a with statement,
+# run(pool, func, inputs, workers) submits the whole input and waits for every result.
+def _run_apply(pool, func, inputs, workers):
+    return [pool.apply(func, (x,)) for x in inputs]
+
+
+def _run_map(pool, func, inputs, workers):
+    return pool.map(func, inputs)
+
+
+def _run_map_async(pool, func, inputs, workers):
+    return pool.map_async(func, inputs).get()
+
+
+def _run_imap(pool, func, inputs, workers):
+    return list(pool.imap(func, inputs, chunksize=max(1, len(inputs) // (4 * workers))))
+
+
+def _run_executor(executor, func, inputs, workers):
+    return list(executor.map(func, inputs))
+
+
+POOL_KINDS = {
+    "pool-apply": (lambda workers: multiprocessing.Pool(processes=workers), _run_apply),
+    "pool-map": (lambda workers: multiprocessing.Pool(processes=workers), _run_map),
+    "pool-map_async": (lambda workers: multiprocessing.Pool(processes=workers), _run_map_async),
+    "pool-imap": (lambda workers: multiprocessing.Pool(processes=workers), _run_imap),
+    "thread-executor": (lambda workers: concurrent.futures.ThreadPoolExecutor(max_workers=workers), _run_executor),
+    "process-executor": (lambda workers: concurrent.futures.ProcessPoolExecutor(max_workers=workers), _run_executor),
+}
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a list of values, p in [0, 100]."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(runs):
+    return {
+        "runs": runs,
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.mean(runs),
+        "p90": percentile(runs, 90),
+        "p99": percentile(runs, 99),
+    }
+
+
+def bench_cell(kernel, kind, workers, size, repeats=5, warmup=1, seed=0):
+    """Time one cell of the matrix, returning its summary."""
+    func, generate = KERNELS[kernel]
+    factory, run = POOL_KINDS[kind]
+    inputs = generate(random.Random(seed), size)
+
+    with factory(workers) as pool:
+        # Warm up: start every worker and fill the caches, not measured
+        for _ in range(warmup):
+            run(pool, func, inputs[:max(workers * 4, 1)], workers)
+        runs = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run(pool, func, inputs, workers)
+            runs.append(time.perf_counter() - start)
+
+    result = {"kernel": kernel, "kind": kind, "workers": workers, "size": size}
+    result.update(summarize(runs))
+    return result
+
+
+def run_matrix(kernels, kinds, workers, sizes, repeats=5, warmup=1, seed=0):
+    results = []
+    for kernel in kernels:
+        for kind in kinds:
+            for w in workers:
+                for size in sizes:
+                    r = bench_cell(kernel, kind, w, size, repeats, warmup, seed)
+                    print(f"{kernel:<10} {kind:<17} workers={w:<3} size={size:<8} "
+                          f"median={r['median'] * 1000:9.2f} ms  p90={r['p90'] * 1000:9.2f} ms")
+                    results.append(r)
+    return results
+
+
+def metadata(repeats, warmup, seed):
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "start_method": multiprocessing.get_start_method(),
+        "repeats": repeats,
+        "warmup": warmup,
+        "seed": seed,
+    }
+
+
+def compare(results, baseline):
+    """Print the median of every cell relative to the same cell of a baseline JSON file."""
+    key = lambda r: (r["kernel"], r["kind"], r["workers"], r["size"])
+    old = {key(r): r for r in baseline["results"]}
+    print("Relative to baseline (> 1.00 means slower):")
+    for r in results:
+        if key(r) in old:
+            ratio = r["median"] / old[key(r)]["median"]
+            flag = "  <-- regression" if ratio > 1.10 else ""
+            print(f"{r['kernel']:<10} {r['kind']:<17} workers={r['workers']:<3} size={r['size']:<8} "
+                  f"{ratio:5.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pool examples of TD5 and Thread&ProcessPools.py")
+    parser.add_argument("--kernels", nargs="+", default=list(KERNELS), choices=list(KERNELS))
+    parser.add_argument("--kinds", nargs="+", default=list(POOL_KINDS), choices=list(POOL_KINDS))
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--compare", help="baseline JSON file written by an earlier run")
+    args = parser.parse_args(argv)
+
+    results = run_matrix(args.kernels, args.kinds, args.workers, args.sizes,
+                         args.repeats, args.warmup, args.seed)
+    with open(args.output, "w") as f:
+        json.dump({"meta": metadata(args.repeats, args.warmup, args.seed), "results": results}, f, indent=2)
+    print("Results written to", args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
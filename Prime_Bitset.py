@@ -0,0 +1,163 @@
+"""
+BITSET PRIMALITY RESULTS
+------------------------
+TD5's is_prime returns a tuple (n, True/False) per integer. pool.map pickles every one of them to send it back
+to the parent, and the parent unpickles them into Python objects: a tuple, an int and a bool reference,
+about 100 bytes of objects per integer, and some 8 bytes of pickle each.
+
+In chunked bitset mode, a task is a whole range or array of integers and its result is one bit per integer,
+aligned with the input:
+- range_bits((lo, hi)): the task is just two integers, the result (hi - lo) / 8 bytes, from a segmented sieve;
+- array_bits(numbers): the task is an int64 array (8 bytes per integer), the result one bit per integer,
+  from the sieve table of the worker (NumPy fancy indexing) or Miller-Rabin above it.
+
+The parent keeps the input next to the bits (PrimeBits, one per chunk; PrimeResults, for all of them) and answers
+count() (a popcount of the bits), primes() (a NumPy array of the primes), or the n-th flag, without ever
+building a tuple. tuples() still gives TD5's (n, True/False) pairs when they are really needed.
+
+    python Prime_Bitset.py       # bytes over the pipe and parent CPU time: tuples vs bitsets
+"""
+import time
+import pickle
+import random
+import multiprocessing
+
+import numpy as np
+
+from Prime_Sieve import PrimeSieve, segment, miller_rabin, is_prime_batch, SEGMENT_MAX
+
+CHUNK_SIZE = 100_000
+
+_sieve = None    # one table per process, built on first use
+
+
+def init_worker():
+    global _sieve
+    _sieve = PrimeSieve()
+
+
+def pack(flags):
+    """One byte per integer (0/1) -> one bit per integer, little-endian bit order."""
+    return np.packbits(np.frombuffer(flags, dtype=np.uint8), bitorder="little").tobytes()
+
+
+def range_bits(task):
+    """Pool task: packed primality bits of range(lo, hi)."""
+    lo, hi = task
+    return pack(segment(lo, hi))
+
+
+def array_bits(numbers):
+    """Pool task: packed primality bits of an int64 array, aligned with it."""
+    if _sieve is None:
+        init_worker()
+    numbers = np.asarray(numbers, dtype=np.int64)
+    table = np.frombuffer(_sieve.flags, dtype=np.uint8)
+    inside = (numbers >= _sieve.lo) & (numbers < _sieve.hi)
+    flags = np.zeros(len(numbers), dtype=np.uint8)
+    flags[inside] = table[numbers[inside] - _sieve.lo]
+    for i in np.flatnonzero(~inside):
+        flags[i] = miller_rabin(int(numbers[i]))
+    return pack(flags)
+
+
+class PrimeBits:
+    """Primality of a chunk of integers: the integers (a range or an array) and one bit for each."""
+    def __init__(self, numbers, bits):
+        self.numbers = numbers
+        self.bits = bits
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def mask(self):
+        return np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8), count=len(self.numbers),
+                             bitorder="little").view(bool)
+
+    def count(self):
+        """Number of primes (padding bits are zero)."""
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def primes(self):
+        if isinstance(self.numbers, range):
+            return np.flatnonzero(self.mask()) + self.numbers.start
+        return self.numbers[self.mask()]
+
+    def __getitem__(self, i):
+        """Flag of the i-th integer of the chunk."""
+        i = range(len(self.numbers))[i]
+        return bool(self.bits[i >> 3] >> (i & 7) & 1)
+
+    def tuples(self):
+        """TD5's (n, True/False) pairs, only when really needed."""
+        return zip((int(n) for n in self.numbers), self.mask().tolist())
+
+
+class PrimeResults(list):
+    """PrimeBits of every chunk, in input order."""
+    def count(self):
+        return sum(chunk.count() for chunk in self)
+
+    def primes(self):
+        return np.concatenate([chunk.primes() for chunk in self]) if self else np.empty(0, dtype=np.int64)
+
+    def tuples(self):
+        for chunk in self:
+            yield from chunk.tuples()
+
+
+def test_range(pool, lo, hi, chunk_size=CHUNK_SIZE):
+    """Primality of every integer of range(lo, hi)."""
+    chunk_size = min(chunk_size, SEGMENT_MAX)
+    tasks = [(start, min(start + chunk_size, hi)) for start in range(lo, hi, chunk_size)]
+    return PrimeResults(PrimeBits(range(a, b), bits) for (a, b), bits in zip(tasks, pool.map(range_bits, tasks)))
+
+
+def test_numbers(pool, numbers, chunk_size=CHUNK_SIZE):
+    """Primality of every integer of an array (or list) of integers."""
+    numbers = np.asarray(numbers, dtype=np.int64)
+    chunks = [numbers[i:i + chunk_size] for i in range(0, len(numbers), chunk_size)]
+    return PrimeResults(PrimeBits(c, bits) for c, bits in zip(chunks, pool.map(array_bits, chunks)))
+
+
+# --- measurement --------------------------------------------------------------
+
+def measure(label, run):
+    """
+    run() returns (results as sent by the workers, primes found by the parent).
+    Prints the bytes of the pickled results (what goes through the result pipe) and the CPU time of the parent.
+    """
+    cpu, wall = time.process_time(), time.perf_counter()
+    sent, primes = run()
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    size = sum(len(pickle.dumps(r)) for r in sent)
+    print(f"  {label:18} {size / 1e6:8.2f} MB over the pipe, parent CPU {cpu:6.2f} s, wall {wall:6.2f} s")
+    return primes
+
+
+def compare(pool, chunks, bitsets):
+    def tuples():
+        sent = pool.map(is_prime_batch, chunks)
+        return sent, [n for chunk in sent for n, prime in chunk if prime]
+
+    def bits():
+        results = bitsets()
+        return [chunk.bits for chunk in results], results.primes().tolist()
+
+    assert measure("(n, bool) tuples", tuples) == measure("bitsets", bits)
+
+
+def benchmark(count=1_000_000, processes=4):
+    indexes = [random.randint(10**3, 10**6) for i in range(count)]
+    lo, hi = 10**6, 10**6 + count
+    with multiprocessing.Pool(processes=processes, initializer=init_worker) as pool:
+        print(f"{count:,} random integers:")
+        compare(pool, [indexes[i:i + CHUNK_SIZE] for i in range(0, count, CHUNK_SIZE)],
+                lambda: test_numbers(pool, indexes))
+        print(f"range({lo:,}, {hi:,}):")
+        compare(pool, [range(i, min(i + CHUNK_SIZE, hi)) for i in range(lo, hi, CHUNK_SIZE)],
+                lambda: test_range(pool, lo, hi))
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,212 @@
+"""
+ADAPTIVE CHUNKSIZE & WORK STEALING
+----------------------------------
+pool.map(is_prime, indexes) cuts the input in chunks of equal length (len / (4 * processes)).
+But the cost of is_prime varies a lot: an even number returns at once, a large prime runs
+the whole loop up to sqrt(n). Equal-length chunks therefore have very different costs, and at the
+end of the map some workers are idle while one of them is still busy with an expensive chunk.
+
+This dispatcher fixes that in three steps:
+1- Cost estimation: every item gets an estimated cost (estimate_cost below mimics the trial-division loop).
+2- Adaptive chunksize: consecutive items are grouped until a chunk reaches the target cost,
+   total cost / (workers * chunks_per_worker). Cheap items end up in long chunks, expensive ones in short chunks.
+3- Work stealing: chunks are dealt to one queue per worker, most expensive first to the least loaded worker.
+   A worker whose own queue is empty takes the remaining chunks from the queues of busy workers.
+
+After every map, the dispatcher reports the load balance of every worker (chunks, items, stolen chunks, busy time).
+"""
+import math
+import queue
+import pickle
+import random
+import time
+import traceback
+import multiprocessing
+from dataclasses import dataclass
+
+from Prime_Sieve import is_prime_trial
+
+
+def estimate_cost(n):
+    """Estimated number of loop iterations of the TD5 trial-division is_prime(n)."""
+    if n < 3 or n % 2 == 0:
+        return 1
+    for i, p in enumerate((3, 5, 7, 11, 13), start=1):
+        if n % p == 0:
+            return i + 1
+    return math.isqrt(n) // 2 + 1    # no small factor: assume the loop runs to the end
+
+
+def make_chunks(items, cost, workers, chunks_per_worker=8):
+    """
+    Group consecutive items into chunks of roughly equal estimated cost.
+    Returns a list of (start, end, cost) where items[start:end] is the chunk.
+    """
+    costs = [cost(x) for x in items]
+    target = max(sum(costs) / (workers * chunks_per_worker), 1)
+    chunks = []
+    start, acc = 0, 0
+    for i, c in enumerate(costs):
+        acc += c
+        if acc >= target:
+            chunks.append((start, i + 1, acc))
+            start, acc = i + 1, 0
+    if start < len(items):
+        chunks.append((start, len(items), acc))
+    return chunks
+
+
+@dataclass
+class WorkerStats:
+    """Load balance of one worker during the last map."""
+    worker: int
+    chunks: int = 0
+    items: int = 0
+    stolen: int = 0
+    busy: float = 0.0
+
+
+class WorkerError(Exception):
+    """A worker process died before sending back the results of all its chunks."""
+
+
+def _worker(worker_id, func, items, queues, remaining, results):
+    """Run chunks until none is left; on an exception, send it back (in place of the results) and stop."""
+    own = queues[worker_id]
+    others = queues[worker_id + 1:] + queues[:worker_id]    # victims, starting with the next worker
+    while True:
+        stolen = False
+        try:
+            start, end = own.get(timeout=0.001)
+        except queue.Empty:
+            for victim in others:
+                try:
+                    start, end = victim.get_nowait()
+                except queue.Empty:
+                    continue
+                stolen = True
+                break
+            else:
+                if remaining.value == 0:    # every chunk has been taken: nothing left to steal
+                    break
+                continue
+        with remaining.get_lock():
+            remaining.value -= 1
+        t0 = time.perf_counter()
+        try:
+            chunk_results = [func(x) for x in items[start:end]]
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(f"{e!r}\n{traceback.format_exc()}")     # unpicklable exception
+            results.put((worker_id, start, e, time.perf_counter() - t0, stolen))
+            break
+        busy = time.perf_counter() - t0
+        results.put((worker_id, start, chunk_results, busy, stolen))
+
+
+def _next_result(results, workers):
+    """Next chunk result; WorkerError if a worker crashed, or if every worker exited and nothing is left."""
+    while True:
+        exited = [p for p in workers if p.exitcode is not None]    # before get(): their results are queued
+        try:
+            return results.get(timeout=0.1)
+        except queue.Empty:
+            crashed = [p for p in exited if p.exitcode != 0]
+            if crashed:
+                raise WorkerError(f"worker {crashed[0].pid} exited with code {crashed[0].exitcode}") from None
+            if len(exited) == len(workers):
+                raise WorkerError("every worker exited with chunks still missing") from None
+
+
+class WorkStealingDispatcher:
+    """
+    Replacement for pool.map(func, items) that picks its own chunk size from an estimated
+    cost per item and lets idle workers steal chunks from busy ones.
+    """
+    def __init__(self, func, processes=None, cost=estimate_cost, chunks_per_worker=8):
+        self.func = func
+        self.processes = processes or multiprocessing.cpu_count()
+        self.cost = cost
+        self.chunks_per_worker = chunks_per_worker
+        self.stats = []
+        self.elapsed = 0.0
+
+    def map(self, items):
+        items = list(items)
+        if not items:
+            return []
+        chunks = make_chunks(items, self.cost, self.processes, self.chunks_per_worker)
+
+        # Deal the chunks, most expensive first, to the currently least loaded worker
+        queues = [multiprocessing.Queue() for _ in range(self.processes)]
+        loads = [0] * self.processes
+        for start, end, c in sorted(chunks, key=lambda chunk: -chunk[2]):
+            w = loads.index(min(loads))
+            queues[w].put((start, end))
+            loads[w] += c
+
+        remaining = multiprocessing.Value('i', len(chunks))
+        results = multiprocessing.Queue()
+        t0 = time.perf_counter()
+        workers = [multiprocessing.Process(target=_worker,
+                                           args=(i, self.func, items, queues, remaining, results))
+                   for i in range(self.processes)]
+        for p in workers:
+            p.start()
+
+        # Reassemble the results in input order while computing the load balance
+        output = [None] * len(items)
+        self.stats = [WorkerStats(i) for i in range(self.processes)]
+        try:
+            for _ in chunks:
+                worker_id, start, chunk_results, busy, stolen = _next_result(results, workers)
+                if isinstance(chunk_results, BaseException):
+                    raise chunk_results     # func raised in the worker: re-raise it here
+                output[start:start + len(chunk_results)] = chunk_results
+                s = self.stats[worker_id]
+                s.chunks += 1
+                s.items += len(chunk_results)
+                s.stolen += stolen
+                s.busy += busy
+        except BaseException:
+            for p in workers:   # the other chunks are not needed any more
+                p.terminate()
+            raise
+        finally:
+            self.elapsed = time.perf_counter() - t0
+            for p in workers:
+                p.join()
+        return output
+
+    @property
+    def utilisation(self):
+        """Fraction of the pool's time spent working during the last map (1.0 = no idle worker)."""
+        if not self.elapsed:
+            return 0.0
+        return sum(s.busy for s in self.stats) / (self.processes * self.elapsed)
+
+    def report(self):
+        print(f"{'worker':>6} {'chunks':>7} {'items':>9} {'stolen':>7} {'busy (s)':>9} {'load':>6}")
+        for s in self.stats:
+            print(f"{s.worker:>6} {s.chunks:>7} {s.items:>9} {s.stolen:>7} {s.busy:>9.3f} "
+                  f"{s.busy / self.elapsed:>6.0%}")
+        print(f"Elapsed: {self.elapsed:.3f} s, pool utilisation: {self.utilisation:.0%}")
+
+
+if __name__ == "__main__":
+    # Skewed input: mostly even numbers, plus a minority of large primes that run the whole loop
+    primes = [n for n in range(10**12, 10**12 + 3000) if is_prime_trial(n)[1]]
+    indexes = [random.randrange(2, 10**6, 2) for i in range(200_000)] + primes
+    random.shuffle(indexes)
+
+    with multiprocessing.Pool(processes=4) as pool:
+        start = time.perf_counter()
+        expected = pool.map(is_prime_trial, indexes)
+        print("pool.map, default chunksize:", time.perf_counter() - start)
+
+    dispatcher = WorkStealingDispatcher(is_prime_trial, processes=4)
+    result = dispatcher.map(indexes)
+    assert result == expected
+    dispatcher.report()
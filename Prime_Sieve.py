@@ -0,0 +1,197 @@
+"""
+SIEVE-BACKED BATCH PRIMALITY
+----------------------------
+TD5 Ex1 tests every integer with trial division, starting from scratch for each one.
+When millions of integers of the same range go through pool.map, the same divisions are done over and over.
+
+Here the work is shared instead:
+1- A table of small primes is built once (sieve of Eratosthenes) and cached.
+2- For a range [lo, hi) a segmented sieve crosses out the multiples of those small primes,
+   which answers the primality of every integer of the range in one go.
+3- Numbers above the sieve bound fall back to a deterministic Miller-Rabin test, exact below 3.3 * 10**24
+   (larger numbers raise ValueError rather than get an unproven answer).
+
+Two functions are drop-in pool.map targets:
+- is_prime(n) has the same signature and result as the TD5 function, (n, True/False),
+  but each worker answers from a sieve built once per process:
+      pool.map(is_prime, indexes)
+- is_prime_batch(numbers) answers a whole chunk at once, building one segment for the chunk:
+      pool.map(is_prime_batch, chunks)
+"""
+import math
+import random
+import time
+import multiprocessing
+from functools import lru_cache
+
+SIEVE_LIMIT = 10**6 + 1     # numbers below this bound are answered from the per-process table
+SEGMENT_MAX = 1 << 24       # never sieve a segment wider than this (16 MB of flags)
+
+# Deterministic Miller-Rabin: testing the primes up to 41 as bases is exact for every n < MR_LIMIT
+# (the bases up to 37 already fail on 318665857834031151167461 = 399165290221 * 798330580441)
+MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+MR_LIMIT = 3317044064679887385961981
+
+
+def is_prime_trial(n):
+    """The TD5 trial-division test, kept as the reference."""
+    if n < 2:
+        return (n, False)
+    if n == 2:
+        return (n, True)
+    if n % 2 == 0:
+        return (n, False)
+
+    sqrt_n = int(math.floor(math.sqrt(n)))
+    for i in range(3, sqrt_n + 1, 2):
+        if n % i == 0:
+            return (n, False)
+    return (n, True)
+
+
+def sieve(limit):
+    """Return a bytearray flags where flags[n] == 1 iff n is prime, for 0 <= n < limit."""
+    flags = bytearray([1]) * limit
+    flags[:2] = bytes(min(2, limit))
+    for p in range(2, math.isqrt(max(limit - 1, 0)) + 1):
+        if flags[p]:
+            flags[p * p::p] = bytes(len(range(p * p, limit, p)))
+    return flags
+
+
+@lru_cache(maxsize=8)
+def small_primes(bound):
+    """Cached tuple of the primes <= bound."""
+    flags = sieve(bound + 1)
+    return tuple(i for i in range(bound + 1) if flags[i])
+
+
+@lru_cache(maxsize=4)
+def segment(lo, hi):
+    """
+    Segmented sieve of the range [lo, hi): flags[n - lo] == 1 iff n is prime.
+    Only the primes up to sqrt(hi) are needed, so the memory used is that of the segment itself.
+    """
+    lo = max(lo, 0)
+    flags = bytearray([1]) * max(hi - lo, 0)
+    for p in small_primes(math.isqrt(max(hi - 1, 0))):
+        start = max(p * p, -(-lo // p) * p)    # first multiple of p in the segment, p itself excluded
+        flags[start - lo::p] = bytes(len(range(start, hi, p)))
+    for n in range(lo, min(2, hi)):            # 0 and 1 are not primes
+        flags[n - lo] = 0
+    return flags
+
+
+def miller_rabin(n):
+    """
+    Deterministic Miller-Rabin test, exact for n < MR_LIMIT (about 3.3 * 10**24); ValueError above.
+
+    >>> miller_rabin(318665857834031151167461)      # 399165290221 * 798330580441
+    False
+    >>> miller_rabin(10**12 + 39)
+    True
+    """
+    if n < 2:
+        return False
+    if n >= MR_LIMIT:
+        raise ValueError(f"{n} is too large for the deterministic Miller-Rabin bases (limit {MR_LIMIT})")
+    for p in MR_BASES:
+        if n % p == 0:
+            return n == p
+    # write n - 1 = d * 2**s with d odd
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in MR_BASES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+class PrimeSieve:
+    """
+    Primality table for the range [lo, hi), built once.
+    Numbers outside the range are answered by Miller-Rabin.
+    """
+    def __init__(self, lo=0, hi=SIEVE_LIMIT):
+        self.lo = max(lo, 0)
+        self.hi = max(hi, self.lo)
+        self.flags = segment(self.lo, self.hi)
+
+    def __contains__(self, n):
+        if self.lo <= n < self.hi:
+            return bool(self.flags[n - self.lo])
+        return miller_rabin(n)
+
+    def check(self, numbers):
+        """Answer a whole batch, as a list of (n, True/False) like TD5's is_prime."""
+        lo, hi, flags = self.lo, self.hi, self.flags
+        return [(n, bool(flags[n - lo]) if lo <= n < hi else miller_rabin(n)) for n in numbers]
+
+
+_sieve = None    # one table per process, built on first use
+
+
+def init_worker(lo=0, hi=SIEVE_LIMIT):
+    """Pool initializer: build the table once per worker, before any task arrives."""
+    global _sieve
+    _sieve = PrimeSieve(lo, hi)
+
+
+def is_prime(n):
+    """Drop-in replacement for TD5's is_prime, answered from the per-process table."""
+    if _sieve is None:
+        init_worker()
+    return (n, n in _sieve)
+
+
+def is_prime_batch(numbers):
+    """
+    Answer a chunk of integers at once, as a list of (n, True/False).
+    Small numbers come from the per-process table; if the rest of the chunk spans a narrow enough range
+    it is answered by one segmented sieve, otherwise by Miller-Rabin.
+    """
+    if _sieve is None:
+        init_worker()
+    numbers = list(numbers)
+    above = [n for n in numbers if n >= _sieve.hi]
+    if not above:
+        return _sieve.check(numbers)
+    lo, hi = min(above), max(above) + 1
+    if hi - lo <= SEGMENT_MAX and math.isqrt(hi) < hi - lo:
+        table = PrimeSieve(lo, hi)
+        return [(n, n in (table if n >= lo else _sieve)) for n in numbers]
+    return _sieve.check(numbers)
+
+
+def chunked(numbers, size):
+    """Split a list into chunks of `size` items, for pool.map(is_prime_batch, ...)."""
+    return [numbers[i:i + size] for i in range(0, len(numbers), size)]
+
+
+if __name__ == "__main__":
+    indexes = [random.randint(10**3, 10**6) for i in range(1_000_000)]
+
+    with multiprocessing.Pool(processes=4) as pool:
+        start = time.perf_counter()
+        expected = pool.map(is_prime_trial, indexes, chunksize=10_000)
+        print("Trial division, pool.map:  ", time.perf_counter() - start)
+
+    with multiprocessing.Pool(processes=4, initializer=init_worker) as pool:
+        start = time.perf_counter()
+        result = pool.map(is_prime, indexes, chunksize=10_000)
+        print("Sieve table, pool.map:     ", time.perf_counter() - start)
+        assert result == expected
+
+        start = time.perf_counter()
+        result = [x for chunk in pool.map(is_prime_batch, chunked(indexes, 10_000)) for x in chunk]
+        print("Sieve table, batch chunks: ", time.perf_counter() - start)
+        assert result == expected
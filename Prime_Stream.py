@@ -0,0 +1,130 @@
+"""
+STREAMING PRIME-TESTING PIPELINE
+--------------------------------
+TD5 builds the whole list of random integers, then pool.map(is_prime, indexes) builds the whole list of
+(n, True/False) results before anything is printed. For 100M integers, the input list and the result list take
+gigabytes, and nothing comes out before the end.
+
+Here memory does not depend on the number of integers:
+
+    lazy input generator -> chunks -> Pool.imap_unordered(is_prime_batch) -> sink (file or callback)
+
+- the integers are produced on demand (random_integers() is a generator), and cut into chunks on the fly;
+- imap_unordered() alone would not bound anything: its task handler thread consumes the input iterator as
+  fast as it can, and results pile up in the parent if the sink is slower than the workers. So the input
+  goes through a gate: a semaphore taken for every chunk handed to the pool and given back for every chunk of
+  results consumed by the sink. At most `max_in_flight` chunks exist at any time (queued, being tested, or
+  waiting for the sink);
+- results go to the sink chunk by chunk, in the order workers finish (each result carries its integer).
+
+Workers use the sieve-backed is_prime_batch of Prime_Sieve.py.
+
+    python Prime_Stream.py 100000000 primes.txt     # stream 100M results to a file
+    python Prime_Stream.py                          # peak memory for growing sizes, vs the TD5 lists
+"""
+import sys
+import time
+import random
+import resource
+import threading
+import multiprocessing
+from itertools import islice
+
+from Prime_Sieve import init_worker, is_prime_batch
+
+CHUNK_SIZE = 10_000
+MAX_IN_FLIGHT = 32      # chunks, per pipeline
+
+
+def random_integers(count, lo=10**3, hi=10**6, seed=None):
+    """TD5's random.randint(lo, hi) integers, generated on demand."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield rng.randint(lo, hi)
+
+
+def chunks(numbers, size=CHUNK_SIZE):
+    it = iter(numbers)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+class Gate:
+    """Lets at most `limit` items through until release() is called for earlier ones."""
+    def __init__(self, limit):
+        self.semaphore = threading.Semaphore(limit)
+        self.closed = False
+
+    def __call__(self, items):
+        for item in items:
+            self.semaphore.acquire()    # blocks the pool's task handler thread while the window is full
+            if self.closed:
+                return
+            yield item
+
+    def release(self):
+        self.semaphore.release()
+
+    def close(self):
+        """Unblock and stop the producer (e.g. if the sink failed)."""
+        self.closed = True
+        self.semaphore.release()
+
+
+def stream_primes(numbers, sink, processes=None, chunk_size=CHUNK_SIZE, max_in_flight=MAX_IN_FLIGHT):
+    """
+    Test every integer of the iterable `numbers`, call sink(results) for every chunk of (n, True/False) results.
+    Returns (number of integers tested, number of primes).
+    """
+    gate = Gate(max_in_flight)
+    tested = primes = 0
+    with multiprocessing.Pool(processes=processes, initializer=init_worker) as pool:
+        try:
+            for results in pool.imap_unordered(is_prime_batch, gate(chunks(numbers, chunk_size))):
+                sink(results)
+                tested += len(results)
+                primes += sum(prime for n, prime in results)
+                del results
+                gate.release()      # this chunk is gone: let one more in
+        finally:
+            gate.close()
+    return tested, primes
+
+
+def file_sink(f):
+    """Sink writing one "n True/False" line per integer to the text file f."""
+    def write(results):
+        f.writelines(f"{n} {prime}\n" for n, prime in results)
+    return write
+
+
+def peak_memory():
+    """Peak resident memory of this process, in MB (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark(sizes=(10**5, 10**6, 10**7), processes=None):
+    print(f"{'integers':>12} {'seconds':>8} {'primes':>10} {'peak MB':>8}")
+    for count in sizes:
+        start = time.perf_counter()
+        tested, primes = stream_primes(random_integers(count, seed=count), lambda results: None, processes)
+        print(f"{tested:>12,} {time.perf_counter() - start:>8.2f} {primes:>10,} {peak_memory():>8.0f}   streaming")
+
+    # TD5's way, last since the peak never goes down: input list + full result list
+    count = sizes[-1]
+    start = time.perf_counter()
+    indexes = list(random_integers(count, seed=count))
+    with multiprocessing.Pool(processes=processes, initializer=init_worker) as pool:
+        results = [x for chunk in pool.map(is_prime_batch, chunks(indexes)) for x in chunk]
+    primes = sum(prime for n, prime in results)
+    print(f"{len(results):>12,} {time.perf_counter() - start:>8.2f} {primes:>10,} {peak_memory():>8.0f}   lists (TD5)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        count = int(sys.argv[1])
+        with open(sys.argv[2], "w") as f:
+            tested, primes = stream_primes(random_integers(count), file_sink(f))
+        print(f"{tested:,} integers tested, {primes:,} primes, peak memory {peak_memory():.0f} MB")
+    else:
+        benchmark()
@@ -0,0 +1,342 @@
+"""
+SHARDED, BATCHED MANAGER OBJECTS
+--------------------------------
+Manager() proxies are slower than Value/Array: every d[1] = 'one' or l.reverse() is a synchronous round trip
+(pickle, send, wait for the reply) to a single server process, which becomes the serialization point when
+many clients use it.
+
+This variant cuts both costs:
+- batched operations: get_many(keys), update_many(items), extend(values), get_many(indices) do many
+  operations in one round trip;
+- client-side write buffering: with buffered=True, d[k] = v only records the write locally; flush()
+  sends all the buffered writes of a shard in a single update_many. Reads see the process's own pending writes;
+  other processes see them after the flush;
+- sharding: the keys of a ShardedDict are spread over several manager server processes by a hash of the key,
+  so clients working on different keys talk to different servers in parallel.
+
+Keys are sharded with a hash that is the same in every process (str/bytes hashes are randomized per process),
+so str, bytes and numbers shard correctly; other keys are sharded by their pickle, so two equal keys must pickle
+identically.
+
+    python Sharded_Manager.py      # the SharingState_Intro.py example, then a benchmark against Manager().dict()
+"""
+import time
+import zlib
+import pickle
+from multiprocessing import Process, Manager
+from multiprocessing.managers import BaseManager
+
+MISSING = object()
+
+
+class Shard:
+    """Part of a sharded dict living in one manager server process."""
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def get_many(self, keys, default=None):
+        return [self.data.get(k, default) for k in keys]
+
+    def update_many(self, items):
+        self.data.update(items)
+
+    def delete_many(self, keys):
+        for k in keys:
+            self.data.pop(k, None)
+
+    def contains(self, key):
+        return key in self.data
+
+    def items(self):
+        return list(self.data.items())
+
+    def size(self):
+        return len(self.data)
+
+
+class BatchList(list):
+    """A list with batched reads, served by a manager."""
+    def get_many(self, indices):
+        return [self[i] for i in indices]
+
+    def copy(self):
+        return list(self)
+
+
+class ShardManager(BaseManager):
+    pass
+
+
+ShardManager.register("Shard", Shard)
+ShardManager.register("BatchList", BatchList,
+                      exposed=("get_many", "copy", "extend", "reverse", "append", "__getitem__", "__setitem__",
+                               "__len__", "sort", "pop", "insert"))
+
+
+def stable_hash(key):
+    """Hash equal in every process (unlike hash() of str/bytes)."""
+    if isinstance(key, str):
+        return zlib.crc32(key.encode())
+    if isinstance(key, bytes):
+        return zlib.crc32(key)
+    if isinstance(key, (int, float)):
+        return hash(key)        # numeric hashes are not randomized, and 1 == 1.0 hash alike
+    return zlib.crc32(pickle.dumps(key))
+
+
+class ShardedDict:
+    """Dict spread over several Shard objects, one per manager server process."""
+    def __init__(self, shards, buffered=False):
+        self.shards = shards
+        self.buffered = buffered
+        self.pending = [{} for _ in shards]     # buffered writes, per shard
+
+    def __getstate__(self):
+        # buffered writes belong to the process that made them
+        return {"shards": self.shards, "buffered": self.buffered}
+
+    def __setstate__(self, state):
+        self.__init__(state["shards"], state["buffered"])
+
+    def _index(self, key):
+        return stable_hash(key) % len(self.shards)
+
+    def __setitem__(self, key, value):
+        i = self._index(key)
+        if self.buffered:
+            self.pending[i][key] = value
+        else:
+            self.shards[i].update_many({key: value})
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        i = self._index(key)
+        if key in self.pending[i]:
+            return self.pending[i][key]
+        return self.shards[i].get(key, default)
+
+    def __contains__(self, key):
+        i = self._index(key)
+        return key in self.pending[i] or self.shards[i].contains(key)
+
+    def __delitem__(self, key):
+        self.flush()
+        self.shards[self._index(key)].delete_many([key])
+
+    def update_many(self, items):
+        """Write many items, one round trip per shard (or none until flush() when buffered)."""
+        items = items.items() if hasattr(items, "items") else items
+        per_shard = [{} for _ in self.shards]
+        for key, value in items:
+            per_shard[self._index(key)][key] = value
+        for i, batch in enumerate(per_shard):
+            if not batch:
+                continue
+            if self.buffered:
+                self.pending[i].update(batch)
+            else:
+                self.shards[i].update_many(batch)
+
+    update = update_many
+
+    def get_many(self, keys, default=None):
+        """Read many keys, one round trip per shard."""
+        keys = list(keys)
+        per_shard = [[] for _ in self.shards]
+        for key in keys:
+            per_shard[self._index(key)].append(key)
+        found = {}
+        for i, shard_keys in enumerate(per_shard):
+            remote = [k for k in shard_keys if k not in self.pending[i]]
+            if remote:
+                found.update(zip(remote, self.shards[i].get_many(remote, default)))
+            found.update((k, self.pending[i][k]) for k in shard_keys if k in self.pending[i])
+        return [found[k] for k in keys]
+
+    def flush(self):
+        """Send the buffered writes: one update_many per shard that has some."""
+        for i, batch in enumerate(self.pending):
+            if batch:
+                self.shards[i].update_many(batch)
+                self.pending[i] = {}
+
+    def items(self):
+        self.flush()
+        return [item for shard in self.shards for item in shard.items()]
+
+    def keys(self):
+        return [key for key, value in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        self.flush()
+        return sum(shard.size() for shard in self.shards)
+
+    def copy(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
+class BufferedList:
+    """List proxy with client-side buffering of appends (sent with one extend on flush)."""
+    def __init__(self, proxy, buffered=False):
+        self.proxy = proxy
+        self.buffered = buffered
+        self.pending = []
+
+    def __getstate__(self):
+        return {"proxy": self.proxy, "buffered": self.buffered}
+
+    def __setstate__(self, state):
+        self.__init__(state["proxy"], state["buffered"])
+
+    def append(self, value):
+        if self.buffered:
+            self.pending.append(value)
+        else:
+            self.proxy.append(value)
+
+    def extend(self, values):
+        if self.buffered:
+            self.pending.extend(values)
+        else:
+            self.proxy.extend(list(values))
+
+    def flush(self):
+        if self.pending:
+            self.proxy.extend(self.pending)
+            self.pending = []
+
+    def get_many(self, indices):
+        self.flush()
+        return self.proxy.get_many(list(indices))
+
+    def reverse(self):
+        self.flush()
+        self.proxy.reverse()
+
+    def __getitem__(self, i):
+        self.flush()
+        return self.proxy[i]
+
+    def __setitem__(self, i, value):
+        self.flush()
+        self.proxy[i] = value
+
+    def __len__(self):
+        self.flush()
+        return len(self.proxy)
+
+    def copy(self):
+        self.flush()
+        return self.proxy.copy()
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
+class ShardedManager:
+    """Starts `shards` manager server processes and creates sharded dicts / buffered lists on them."""
+    def __init__(self, shards=4):
+        self.managers = [ShardManager() for _ in range(shards)]
+        self._next = 0
+
+    def start(self):
+        for m in self.managers:
+            m.start()
+        return self
+
+    def shutdown(self):
+        for m in self.managers:
+            m.shutdown()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def dict(self, buffered=False):
+        return ShardedDict([m.Shard() for m in self.managers], buffered)
+
+    def list(self, values=(), buffered=False):
+        # a list keeps its order, so it lives in a single server: spread the lists over the shards
+        manager = self.managers[self._next % len(self.managers)]
+        self._next += 1
+        return BufferedList(manager.BatchList(list(values)), buffered)
+
+
+# --- the SharingState_Intro.py example ------------------------------------------
+
+def f(d, l):
+    d.update_many({1: 'one', 'two': 2})     # one round trip per shard instead of one per item
+    l.reverse()
+    d.flush()
+
+
+# --- benchmark ----------------------------------------------------------------
+
+def _client_plain(d, client, count):
+    for i in range(count):
+        d[(client, i)] = i
+    for i in range(count):
+        d[(client, i)]
+
+
+def _client_sharded(d, client, count, batch=256):
+    keys = [f"{client}:{i}" for i in range(count)]
+    for i, key in enumerate(keys):
+        d[key] = i
+        if i % batch == batch - 1:
+            d.flush()
+    d.flush()
+    for i in range(0, count, batch):
+        d.get_many(keys[i:i + batch])
+
+
+def run_clients(target, d, clients, count):
+    processes = [Process(target=target, args=(d, c, count)) for c in range(clients)]
+    start = time.perf_counter()
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    return 2 * clients * count / (time.perf_counter() - start)
+
+
+def benchmark(clients=8, count=5000, shards=4):
+    with Manager() as manager:
+        rate = run_clients(_client_plain, manager.dict(), clients, count)
+        print(f"Manager().dict(), one round trip per operation: {rate:12,.0f} operations/s")
+    with ShardedManager(shards) as manager:
+        d = manager.dict(buffered=True)
+        rate = run_clients(_client_sharded, d, clients, count)
+        assert len(d) == clients * count
+        print(f"ShardedDict, {shards} shards, batches of 256:      {rate:12,.0f} operations/s")
+
+
+if __name__ == '__main__':
+    with ShardedManager(shards=2) as manager:
+        dct = manager.dict(buffered=True)
+        lst = manager.list(range(10))
+
+        p = Process(target=f, args=(dct, lst))
+        p.start()
+        p.join()
+
+        print(dct)
+        print(lst)
+
+    benchmark()
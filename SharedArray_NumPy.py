@@ -0,0 +1,143 @@
+"""
+ZERO-COPY NUMPY VIEWS OVER SHARED MEMORY
+----------------------------------------
+In SharingState_Intro.py, f(n, a) negates Array('i', range(10)) element by element: every a[i] goes through
+the synchronized ctypes wrapper, which takes and releases the Array's lock and builds a Python int each time.
+
+NumPy can look at the same shared memory without copying it: numpy.ctypeslib.as_array() builds an array whose
+data *is* the shared buffer. A whole-array operation such as np.negative(v, out=v) then runs in C, in place,
+and the other processes see the result.
+- as_array(Array, RawArray or Value) gives the view; for a synchronized Array, the lock is not taken element by element
+  anymore: use `with locked(shared):` around a whole operation if other processes may write at the same time
+  (coarse-grained locking), or nothing at all when processes work on disjoint data (no locking).
+- SharedNDArray does the same over a multiprocessing.shared_memory block, which can be attached by name from
+  unrelated processes and holds any NumPy dtype/shape.
+
+    python SharedArray_NumPy.py     # benchmark against the per-element loop of SharingState_Intro.py
+"""
+import time
+from contextlib import contextmanager, nullcontext
+from multiprocessing import Process, Value, Array, RawArray
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+def as_array(shared):
+    """NumPy view (no copy) of a multiprocessing Array, RawArray or Value; the dtype follows the ctypes type."""
+    raw = shared.get_obj() if hasattr(shared, "get_obj") else shared    # synchronized wrapper -> raw ctypes
+    return np.ctypeslib.as_array(raw)
+
+
+@contextmanager
+def locked(shared):
+    """Coarse-grained locking: hold the lock of a synchronized Array/Value around a whole operation."""
+    lock = shared.get_lock() if hasattr(shared, "get_lock") else nullcontext()
+    with lock:
+        yield
+
+
+class SharedNDArray:
+    """
+    NumPy array living in a multiprocessing.shared_memory block.
+    Pickling it (e.g. passing it to a Process) only sends the block name, dtype and shape;
+    the other side attaches to the same memory.
+    """
+    def __init__(self, shape, dtype=np.float64, name=None):
+        self.shape = tuple(np.atleast_1d(shape))
+        self.dtype = np.dtype(dtype)
+        size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+        self.shm = SharedMemory(name=name, create=name is None, size=size if name is None else 0)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @classmethod
+    def from_array(cls, a):
+        shared = cls(a.shape, a.dtype)
+        shared.array[...] = a
+        return shared
+
+    def __reduce__(self):
+        return (SharedNDArray, (self.shape, self.dtype, self.shm.name))
+
+    def close(self):
+        del self.array      # the view must go before the block can be closed
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+# --- the SharingState_Intro.py example, four ways ------------------------------
+
+def f(n, a):
+    """The original: one locked access per element."""
+    n.value = 3.1415927
+    for i in range(len(a)):
+        a[i] = -a[i]
+
+
+def f_numpy(n, a):
+    """Same work on a NumPy view, with one lock around the whole operation."""
+    n.value = 3.1415927
+    with locked(a):
+        v = as_array(a)
+        np.negative(v, out=v)
+
+
+def f_numpy_nolock(n, a):
+    """Same work on a RawArray (or when nobody else writes): no lock at all."""
+    n.value = 3.1415927
+    v = as_array(a)
+    np.negative(v, out=v)
+
+
+def f_shared_memory(n, shared):
+    n.value = 3.1415927
+    np.negative(shared.array, out=shared.array)
+    shared.close()
+
+
+def run(target, number, vector):
+    p = Process(target=target, args=(number, vector))
+    start = time.perf_counter()
+    p.start()
+    p.join()
+    return time.perf_counter() - start
+
+
+def benchmark(size=1_000_000):
+    number = Value('d', 0.0)
+    print(f"Negating {size:,} shared ints in a child process:")
+
+    vector = Array('i', range(size))
+    print(f"  per-element loop, Array:         {run(f, number, vector):.4f} s")
+    assert vector[size - 1] == -(size - 1)
+
+    vector = Array('i', range(size))
+    print(f"  NumPy view, Array + one lock:    {run(f_numpy, number, vector):.4f} s")
+    assert vector[size - 1] == -(size - 1)
+
+    vector = RawArray('i', range(size))
+    print(f"  NumPy view, RawArray, no lock:   {run(f_numpy_nolock, number, vector):.4f} s")
+    assert vector[size - 1] == -(size - 1)
+
+    shared = SharedNDArray(size, np.int32)
+    shared.array[:] = np.arange(size)
+    print(f"  NumPy view, shared_memory:       {run(f_shared_memory, number, shared):.4f} s")
+    assert shared.array[size - 1] == -(size - 1)
+    shared.close()
+    shared.unlink()
+
+
+if __name__ == '__main__':
+    number = Value('d', 0.0)
+    vector = Array('i', range(10))
+
+    p = Process(target=f_numpy, args=(number, vector))
+    p.start()
+    p.join()
+
+    print(number.value)
+    print(vector[:])
+
+    benchmark()
@@ -0,0 +1,225 @@
+"""
+STREAMING FIBONACCI OVER SHARED MEMORY
+--------------------------------------
+In TD2 Ex1 the child calls shared_list.append(a) on a manager.list() for every term:
+every append is a round trip to the Manager server process, and the parent only sees the sequence
+once the child has finished.
+
+Here the child writes the terms into a multiprocessing.shared_memory block used as a ring buffer,
+and the parent reads them while they are produced:
+
+    +---------+---------+------+--------+----------------------------------------+
+    | write   | read    | done | cancel | data (capacity bytes, used circularly) |
+    | 8 bytes | 8 bytes | 8 B  | 8 B    |                                        |
+    +---------+---------+------+--------+----------------------------------------+
+
+- write/read are the total number of bytes written/read so far. Only the child (single producer)
+  updates write and only the parent (single consumer) updates read, so no lock is needed.
+- Fibonacci terms do not fit in a fixed-width slot (F(94) already overflows 64 bits), so every term
+  is encoded with a variable length: its byte length as a varint, then its bytes.
+  A term larger than the whole ring is simply written and read in several pieces.
+- When the ring is full (writer) or empty (reader), the process waits with a short back-off sleep.
+  A waiting writer stops (BrokenPipeError) if the reader set the cancel flag, e.g. when the consumer of
+  fibo_stream() stops early; a waiting reader stops if the writer process died without finishing.
+
+With large n, the time goes into computing the terms and converting them to bytes
+(int.to_bytes/int.from_bytes), not into IPC round trips.
+"""
+import sys
+import time
+import struct
+from multiprocessing import Process, Manager
+from multiprocessing.shared_memory import SharedMemory
+
+HEADER = struct.Struct("QQQQ")  # write position, read position, done flag, cancel flag
+MAX_BACKOFF = 0.001             # longest sleep while waiting for the other side
+
+
+class ShmStream:
+    """Single-producer/single-consumer byte stream over a shared memory ring buffer."""
+    def __init__(self, capacity=1 << 20, name=None):
+        if name is None:
+            self.shm = SharedMemory(create=True, size=HEADER.size + capacity)
+            HEADER.pack_into(self.shm.buf, 0, 0, 0, 0, 0)
+        else:
+            self.shm = SharedMemory(name=name)
+        self.capacity = self.shm.size - HEADER.size
+        self.pos = self.shm.buf[:HEADER.size].cast("Q")    # pos[0] write, pos[1] read, pos[2] done, pos[3] cancel
+        self.data = self.shm.buf[HEADER.size:HEADER.size + self.capacity]
+        self.writer = None      # producer Process, if known: the reader stops waiting if it dies
+
+    def __reduce__(self):
+        # Another process re-attaches to the same block by name
+        return (ShmStream, (self.capacity, self.shm.name))
+
+    @staticmethod
+    def _wait(delay):
+        time.sleep(delay)
+        return min(delay * 2, MAX_BACKOFF)
+
+    # --- producer side ---
+    def write(self, data):
+        data = memoryview(data)
+        delay = 1e-6
+        while len(data):
+            w = self.pos[0]
+            free = self.capacity - (w - self.pos[1])
+            if not free:
+                if self.pos[3]:
+                    raise BrokenPipeError("the reader cancelled the stream")
+                delay = self._wait(delay)
+                continue
+            delay = 1e-6
+            start = w % self.capacity
+            n = min(len(data), free, self.capacity - start)    # stop at the end of the ring
+            self.data[start:start + n] = data[:n]
+            self.pos[0] = w + n                                  # publish after the copy
+            data = data[n:]
+
+    def write_int(self, x):
+        payload = x.to_bytes((x.bit_length() + 7) // 8, "little")
+        self.write(encode_varint(len(payload)))
+        self.write(payload)
+
+    def finish(self):
+        """Tell the reader that nothing more will be written."""
+        self.pos[2] = 1
+
+    # --- consumer side ---
+    def read(self, size):
+        """Read exactly size bytes; raise EOFError if the writer finished before."""
+        out = bytearray()
+        delay = 1e-6
+        while len(out) < size:
+            r = self.pos[1]
+            available = self.pos[0] - r
+            if not available:
+                if self.pos[2] and self.pos[0] == r:
+                    raise EOFError
+                if self.writer is not None and not self.writer.is_alive() and not self.pos[2] \
+                        and self.pos[0] == r:
+                    raise BrokenPipeError(f"the writer exited with code {self.writer.exitcode} before finishing")
+                delay = self._wait(delay)
+                continue
+            delay = 1e-6
+            start = r % self.capacity
+            n = min(size - len(out), available, self.capacity - start)
+            out += self.data[start:start + n]
+            self.pos[1] = r + n                                  # free the space after the copy
+        return bytes(out)
+
+    def read_int(self):
+        size, shift = 0, 0
+        while True:
+            byte = self.read(1)[0]
+            size |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        return int.from_bytes(self.read(size), "little")
+
+    def __iter__(self):
+        """Yield the integers written by the producer until it finishes."""
+        while True:
+            try:
+                yield self.read_int()
+            except EOFError:
+                return
+
+    def cancel(self):
+        """Tell the writer that nothing more will be read."""
+        self.pos[3] = 1
+
+    def close(self):
+        self.pos.release()
+        self.data.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def encode_varint(n):
+    """LEB128 encoding: 7 bits per byte, high bit set on every byte but the last."""
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def gen_fibo(n, stream):
+    """Child: write the first n Fibonacci terms into the stream as soon as they are computed."""
+    a, b = 0, 1
+    try:
+        for i in range(n):
+            stream.write_int(a)
+            a, b = b, a + b
+        stream.finish()
+    except BrokenPipeError:     # the parent stopped reading
+        pass
+    finally:
+        stream.close()
+
+
+def gen_fibo_manager(n, shared_list):
+    """The TD2 Ex1 child, kept for comparison: one Manager round trip per term."""
+    a, b = 0, 1
+    for i in range(n):
+        shared_list.append(a)
+        a, b = b, a + b
+
+
+def fibo_stream(n, capacity=1 << 20):
+    """
+    Start a child generating n terms and yield them in the parent while they arrive.
+    If the loop stops early, the child is cancelled; if the child dies, BrokenPipeError is raised.
+    """
+    stream = ShmStream(capacity)
+    child_process = Process(target=gen_fibo, args=(n, stream))
+    child_process.start()
+    stream.writer = child_process
+    try:
+        yield from stream
+    finally:
+        stream.cancel()     # unblock the child if it waits for space (early break, exception)
+        child_process.join()
+        stream.close()
+        stream.unlink()
+
+
+def compare(n):
+    start = time.perf_counter()
+    with Manager() as manager:
+        shared_list = manager.list()
+        child_process = Process(target=gen_fibo_manager, args=(n, shared_list))
+        child_process.start()
+        child_process.join()
+        expected = list(shared_list)
+    print(f"Manager list, {n} terms:    {time.perf_counter() - start:.3f} s")
+
+    start = time.perf_counter()
+    terms = list(fibo_stream(n))
+    print(f"Shared memory, {n} terms:   {time.perf_counter() - start:.3f} s")
+    assert terms == expected
+
+    start = time.perf_counter()
+    a, b = 0, 1
+    for i in range(n):
+        a, b = b, a + b
+    print(f"Computation alone:          {time.perf_counter() - start:.3f} s")
+
+
+def main():
+    n = int(input("Enter the number of terms for the Fibonacci sequence: "))
+    print("Fibonacci sequence by child process: ")
+    for term in fibo_stream(n):
+        print(term)     # printed while the child is still computing the next terms
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        compare(int(sys.argv[1]))
+    else:
+        main()
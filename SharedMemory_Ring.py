@@ -0,0 +1,409 @@
+"""
+SHARED-MEMORY RING BUFFER CONNECTION
+------------------------------------
+Pipes.py, TD3.py and MessagePassing_Intro.py move small messages through kernel objects (pipes, sysv queues):
+every message costs at least a write() and a read() system call, plus pickling.
+
+ShmPipe() returns a pair of Connection-like objects whose messages go through single-producer/single-consumer
+ring buffers in multiprocessing.shared_memory (the ring of SharedMemory_Fibo.py, with messages and blocking):
+
+    +-------+------+----------------+----------------+--------+------------------------------+
+    | write | read | reader waiting | writer waiting | closed | data (capacity bytes, ring)  |
+    +-------+------+----------------+----------------+--------+------------------------------+
+
+- a message is its length (uint32) followed by its bytes; it may wrap around the end of the ring, and a
+  message bigger than the ring simply goes through in several pieces;
+- only the writer moves `write` and only the reader moves `read`, each after copying: no lock;
+- a side that cannot progress (ring empty for the reader, full for the writer) first spins a little, then
+  raises its "waiting" flag and sleeps on a notifier, that the other side signals when it moves its position
+  and sees the flag. The notifier is an eventfd (Linux; pickled as a duplicate of the descriptor, so it works
+  with every start method) or else a multiprocessing.Semaphore. Nothing orders the flag and position updates of the two processes, so a
+  wake-up can be missed: the sleep has a short timeout and the position is checked again.
+
+A message that fits in the ring costs no system call while the other side keeps up.
+send_bytes/recv_bytes/recv_bytes_into/send/recv/poll/close behave like multiprocessing.connection.Connection:
+the Pipes.py or TD3.py examples work unchanged with ShmPipe() instead of Pipe(). One difference: an end is
+not reference-counted like a file descriptor, closing it in any process signals EOF to the other end, so only
+close it in the process that uses it.
+
+    python SharedMemory_Ring.py      # latency and throughput against Pipe() and multiprocessing.Queue
+"""
+import os
+import sys
+import time
+import select
+import struct
+import multiprocessing
+from multiprocessing.reduction import ForkingPickler, DupFd
+from multiprocessing.shared_memory import SharedMemory
+
+HEADER = struct.Struct("QQQQQ")     # write, read, reader waiting, writer waiting, closed
+LENGTH = struct.Struct("I")
+CAPACITY = 1 << 20
+SPIN = 200 if (os.cpu_count() or 1) > 1 else 0     # checks before sleeping; useless on a single CPU
+MAX_SLEEP = 0.01                    # longest sleep on a notifier, in case a wake-up was missed
+WRITE, READ, READER_WAITING, WRITER_WAITING, CLOSED = range(5)
+
+
+class EventFdNotifier:
+    """Wake-up through a Linux eventfd."""
+    def __init__(self):
+        self.fd = os.eventfd(0, os.EFD_NONBLOCK)
+
+    def __reduce__(self):
+        # the fd number means nothing in a spawned or forkserver child: send the descriptor itself, like
+        # multiprocessing does for sockets and connections
+        return (EventFdNotifier._rebuild, (DupFd(self.fd),))
+
+    @classmethod
+    def _rebuild(cls, dup):
+        notifier = cls.__new__(cls)
+        notifier.fd = dup.detach()
+        return notifier
+
+    def wait(self, timeout):
+        select.select([self.fd], [], [], timeout)
+        try:
+            os.eventfd_read(self.fd)
+        except BlockingIOError:
+            pass
+
+    def notify(self):
+        os.eventfd_write(self.fd, 1)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SemaphoreNotifier:
+    """Wake-up through a multiprocessing.Semaphore, for platforms without eventfd."""
+    def __init__(self):
+        self.semaphore = multiprocessing.Semaphore(0)
+
+    def wait(self, timeout):
+        self.semaphore.acquire(timeout=timeout)
+
+    def notify(self):
+        self.semaphore.release()
+
+    def close(self):
+        pass
+
+
+def make_notifier():
+    if hasattr(os, "eventfd"):
+        return EventFdNotifier()
+    return SemaphoreNotifier()
+
+
+class Ring:
+    """One direction: SPSC message ring in shared memory, with its two notifiers."""
+    def __init__(self, capacity=CAPACITY):
+        self.shm = SharedMemory(create=True, size=HEADER.size + capacity)
+        HEADER.pack_into(self.shm.buf, 0, 0, 0, 0, 0, 0)
+        self.capacity = capacity
+        self.pos = self.shm.buf[:HEADER.size].cast("Q")
+        self.data = self.shm.buf[HEADER.size:]
+        self.readable = make_notifier()     # the reader sleeps on it
+        self.writable = make_notifier()     # the writer sleeps on it
+
+    def __getstate__(self):
+        # another process attaches to the same block by name
+        return {"name": self.shm.name, "capacity": self.capacity,
+                "readable": self.readable, "writable": self.writable}
+
+    def __setstate__(self, state):
+        self.shm = SharedMemory(name=state["name"])
+        self.capacity = state["capacity"]
+        self.pos = self.shm.buf[:HEADER.size].cast("Q")
+        self.data = self.shm.buf[HEADER.size:HEADER.size + self.capacity]
+        self.readable = state["readable"]
+        self.writable = state["writable"]
+
+    def _sleep(self, flag, notifier, ready, sleep):
+        # announce that we sleep, check again, then sleep
+        self.pos[flag] = 1
+        if not ready():
+            notifier.wait(sleep)
+        self.pos[flag] = 0
+        return min(sleep * 2, MAX_SLEEP)
+
+    def _wait(self, flag, notifier, ready):
+        for _ in range(SPIN):
+            if ready():
+                return
+        sleep = 1e-4
+        while not ready():
+            sleep = self._sleep(flag, notifier, ready, sleep)
+
+    # --- writer side ---
+    def write(self, data):
+        data = memoryview(data).cast("B")
+        pos = self.pos
+        while len(data):
+            w = pos[WRITE]
+            free = self.capacity - (w - pos[READ])
+            if not free:
+                self._wait(WRITER_WAITING, self.writable, lambda: pos[WRITE] - pos[READ] < self.capacity)
+                continue
+            start = w % self.capacity
+            n = min(len(data), free, self.capacity - start)
+            self.data[start:start + n] = data[:n]
+            pos[WRITE] = w + n                  # publish after the copy
+            if pos[READER_WAITING]:
+                self.readable.notify()
+            data = data[n:]
+
+    def close_writer(self):
+        self.pos[CLOSED] = 1
+        self.readable.notify()
+
+    # --- reader side ---
+    def available(self):
+        return self.pos[WRITE] - self.pos[READ]
+
+    def _wait_readable(self):
+        pos = self.pos
+        self._wait(READER_WAITING, self.readable, lambda: pos[WRITE] != pos[READ] or pos[CLOSED])
+        if pos[WRITE] == pos[READ]:
+            raise EOFError
+
+    def read_into(self, out):
+        """Fill the writable memoryview `out`; raise EOFError if the writer closed before."""
+        pos = self.pos
+        done = 0
+        while done < len(out):
+            r = pos[READ]
+            available = pos[WRITE] - r
+            if not available:
+                self._wait_readable()
+                continue
+            start = r % self.capacity
+            n = min(len(out) - done, available, self.capacity - start)
+            out[done:done + n] = self.data[start:start + n]
+            pos[READ] = r + n                   # free the space after the copy
+            if pos[WRITER_WAITING]:
+                self.writable.notify()
+            done += n
+
+    def close(self):
+        if self.pos is not None:
+            self.pos.release()
+            self.data.release()
+            self.pos = self.data = None
+            self.shm.close()
+
+    def __del__(self):
+        # a spawned child attaches in __setstate__ and exits without closing: release the views before
+        # SharedMemory.__del__ closes the mapping, or it fails with BufferError
+        if getattr(self, "pos", None) is not None:
+            self.close()
+
+    def unlink(self):
+        self.close()
+        self.shm.unlink()
+        self.readable.close()
+        self.writable.close()
+
+
+class ShmConnection:
+    """Connection-like end of a ShmPipe: reads from one ring, writes to the other."""
+    def __init__(self, reader=None, writer=None):
+        self._reader = reader
+        self._writer = writer
+        self._length = bytearray(LENGTH.size)
+
+    @property
+    def readable(self):
+        return self._reader is not None
+
+    @property
+    def writable(self):
+        return self._writer is not None
+
+    def send_bytes(self, buf, offset=0, size=None):
+        m = memoryview(buf).cast("B")
+        if size is None:
+            size = len(m) - offset
+        m = m[offset:offset + size]
+        ring = self._writer
+        pos = ring.pos
+        w = pos[WRITE]
+        start = w % ring.capacity
+        end = start + LENGTH.size + size
+        if end <= ring.capacity and w + LENGTH.size + size - pos[READ] <= ring.capacity:
+            # fast path: the message fits, without wrapping around
+            LENGTH.pack_into(ring.data, start, size)
+            ring.data[start + LENGTH.size:end] = m
+            pos[WRITE] = w + LENGTH.size + size
+            if pos[READER_WAITING]:
+                ring.readable.notify()
+        else:
+            ring.write(LENGTH.pack(size))
+            ring.write(m)
+
+    def _recv_length(self):
+        self._reader.read_into(memoryview(self._length))
+        return LENGTH.unpack(self._length)[0]
+
+    def recv_bytes(self, maxlength=None):
+        ring = self._reader
+        pos = ring.pos
+        r = pos[READ]
+        start = r % ring.capacity
+        available = pos[WRITE] - r
+        if available >= LENGTH.size and start + LENGTH.size <= ring.capacity:
+            size, = LENGTH.unpack_from(ring.data, start)
+            end = start + LENGTH.size + size
+            if available >= LENGTH.size + size and end <= ring.capacity and (maxlength is None or size <= maxlength):
+                # fast path: the whole message is there, without wrapping around
+                data = bytes(ring.data[start + LENGTH.size:end])
+                pos[READ] = r + LENGTH.size + size
+                if pos[WRITER_WAITING]:
+                    ring.writable.notify()
+                return data
+        size = self._recv_length()
+        if maxlength is not None and size > maxlength:
+            raise OSError("bad message length")
+        buf = bytearray(size)
+        self._reader.read_into(memoryview(buf))
+        return bytes(buf)
+
+    def recv_bytes_into(self, buf, offset=0):
+        size = self._recv_length()
+        m = memoryview(buf).cast("B")
+        if size > len(m) - offset:
+            rest = bytearray(size)
+            self._reader.read_into(memoryview(rest))
+            raise multiprocessing.BufferTooShort(bytes(rest))
+        self._reader.read_into(m[offset:offset + size])
+        return size
+
+    def send(self, obj):
+        self.send_bytes(ForkingPickler.dumps(obj))
+
+    def recv(self):
+        return ForkingPickler.loads(self.recv_bytes())
+
+    def poll(self, timeout=0.0):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        sleep = 1e-4
+        while not self._reader.available() and not self._reader.pos[CLOSED]:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(sleep)
+            sleep = min(sleep * 2, MAX_SLEEP)
+        return True
+
+    def close(self):
+        """The other end gets EOFError once it has read everything (the memory goes with ShmPipe.unlink())."""
+        if self._writer is not None:
+            self._writer.close_writer()
+        self._reader = self._writer = None
+
+
+class ShmPipe:
+    """
+    Like multiprocessing.Pipe(duplex): `conn1, conn2 = ShmPipe()`.
+    The creator owns the shared memory blocks: unlink() them once every process is done.
+    """
+    def __init__(self, duplex=True, capacity=CAPACITY):
+        self.rings = [Ring(capacity) for _ in range(2 if duplex else 1)]
+        if duplex:
+            a, b = self.rings
+            self.ends = (ShmConnection(a, b), ShmConnection(b, a))
+        else:
+            self.ends = (ShmConnection(reader=self.rings[0]), ShmConnection(writer=self.rings[0]))
+
+    def __iter__(self):
+        return iter(self.ends)
+
+    def unlink(self):
+        for ring in self.rings:
+            ring.unlink()
+
+
+# --- the Pipes.py example, with ShmPipe ------------------------------------------
+
+def f(conn):
+    conn.send([42, None, 'hello'])
+    conn.close()
+
+
+# --- benchmark ----------------------------------------------------------------
+
+def echo(conn, count):
+    for _ in range(count):
+        conn.send_bytes(conn.recv_bytes())
+
+
+def drain(conn, count):
+    for _ in range(count):
+        conn.recv_bytes()
+
+
+class QueueEnds:
+    """Queue pair behind the send_bytes/recv_bytes interface, to benchmark multiprocessing.Queue."""
+    def __init__(self, outgoing, incoming):
+        self.outgoing = outgoing
+        self.incoming = incoming
+
+    def send_bytes(self, data):
+        self.outgoing.put(data)
+
+    def recv_bytes(self):
+        return self.incoming.get()
+
+
+def make_pair(kind, capacity=CAPACITY):
+    if kind == "Pipe()":
+        return multiprocessing.Pipe(), None
+    if kind == "Queue":
+        a, b = multiprocessing.Queue(), multiprocessing.Queue()
+        return (QueueEnds(a, b), QueueEnds(b, a)), None
+    pipe = ShmPipe(capacity=capacity)
+    return tuple(pipe), pipe
+
+
+def measure(kind, count, size):
+    message = b"x" * size
+    results = {}
+    for mode in ("latency", "throughput"):
+        (here, there), owner = make_pair(kind)
+        target = echo if mode == "latency" else drain
+        p = multiprocessing.Process(target=target, args=(there, count))
+        p.start()
+        start = time.perf_counter()
+        if mode == "latency":
+            for _ in range(count):
+                here.send_bytes(message)
+                here.recv_bytes()
+        else:
+            for _ in range(count):
+                here.send_bytes(message)
+        p.join()
+        seconds = time.perf_counter() - start
+        results[mode] = seconds / count * 1e6 if mode == "latency" else count / seconds
+        if owner:
+            owner.unlink()
+    return results
+
+
+def benchmark(count=100_000, sizes=(64, 4096)):
+    print(f"{'transport':10} {'message':>8} {'round trip':>12} {'one-way throughput':>22}")
+    for size in sizes:
+        for kind in ("Pipe()", "Queue", "ShmPipe"):
+            r = measure(kind, count, size)
+            print(f"{kind:10} {size:>6} B {r['latency']:>9.1f} us {r['throughput']:>15,.0f} msg/s")
+
+
+if __name__ == '__main__':
+    pipe = ShmPipe()
+    parent_conn, child_conn = pipe
+    p = multiprocessing.Process(target=f, args=(child_conn,))
+    p.start()
+    print(parent_conn.recv())   # prints "[42, None, 'hello']"
+    p.join()
+    pipe.unlink()
+
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
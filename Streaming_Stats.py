@@ -0,0 +1,430 @@
+"""
+SINGLE-PASS STREAMING STATISTICS
+--------------------------------
+TD4 Ex2 parses the whole input with sys.stdin.read().split() before any work begins, then five threads go
+through the full list: min, max, mean and stdev are one pass each, and statistics.median sorts a copy.
+The whole input has to fit in memory, several times.
+
+This engine reads stdin chunk by chunk and updates every statistic as the values go by, in one pass:
+- min and max are running values;
+- mean and variance use Welford's algorithm: for every new value x,
+      count += 1;  delta = x - mean;  mean += delta / count;  M2 += delta * (x - mean)
+  and the sample variance is M2 / (count - 1). Unlike sum(x) and sum(x**2), it does not lose precision
+  when the mean is large compared to the spread;
+- the median comes from a quantile sketch (DDSketch): values are counted in logarithmic buckets, so any
+  quantile is known within a relative error alpha (1% by default), in a bounded number of buckets.
+  An exact mode keeps every value (compactly, in an array('d')) and uses statistics.median.
+
+Memory stays bounded (one chunk + the sketch) whatever the size of the input, except in exact mode.
+
+Threads cannot use more than one core because of the GIL. In the process-pool mode, the input is cut into
+chunks and every worker computes a *partial* aggregate of its chunk: count, mean, M2, min, max and a sketch.
+Partials are mergeable: two of them combine exactly into the partial of the concatenated chunks
+(Chan et al.'s formula for M2, bucket-wise sums for the sketches), so the parent only merges a few small
+objects. On a file, every worker reads its own byte range, nothing but the partials crosses the pipes.
+
+    python Streaming_Stats.py < data.txt
+    python Streaming_Stats.py --exact < data.txt
+    python Streaming_Stats.py --processes 4 data.txt
+"""
+import os
+import re
+import sys
+import math
+import statistics
+import multiprocessing
+from array import array
+
+import numpy as np
+
+from Numeric_Parser import parse_block
+
+CHUNK_SIZE = 1 << 20    # characters read from stdin at a time
+CHUNK_BYTES = 1 << 24   # bytes of input per task in the process-pool mode
+MAX_BAD = 100           # bad tokens reported per chunk in the process-pool mode
+
+
+def read_numbers(stream, chunk_size=CHUNK_SIZE, on_error=None):
+    """
+    Yield the numbers of a text stream, reading it chunk by chunk.
+    A token cut by the end of a chunk is kept for the next one. Bad tokens are passed to on_error(token).
+    """
+    rest = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        tokens = (rest + chunk).split()
+        # If the chunk does not end with a space, its last token may continue in the next chunk
+        rest = tokens.pop() if tokens and not chunk[-1].isspace() else ""
+        for s in tokens:
+            try:
+                yield float(s)
+            except ValueError:
+                if on_error:
+                    on_error(s)
+    if rest:
+        try:
+            yield float(rest)
+        except ValueError:
+            if on_error:
+                on_error(rest)
+
+
+class RunningStats:
+    """count, min, max, mean and variance updated one value at a time (Welford)."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    @classmethod
+    def from_array(cls, x):
+        """Partial aggregate of a NumPy array, computed with vectorized operations."""
+        stats = cls()
+        if len(x):
+            stats.count = len(x)
+            with np.errstate(invalid="ignore"):     # inf - inf: nan, as in update()
+                stats.mean = float(x.mean())
+                stats.m2 = float(((x - stats.mean) ** 2).sum())
+            compared = x[~np.isnan(x)]      # update() never takes nan as min or max
+            if len(compared):
+                stats.min = float(compared.min())
+                stats.max = float(compared.max())
+        return stats
+
+    def merge(self, other):
+        """Combine with the partial of another chunk (Chan et al.)."""
+        n = self.count + other.count
+        if not other.count:
+            return
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        """Sample variance, like statistics.variance."""
+        if self.count < 2:
+            raise statistics.StatisticsError("variance requires at least two data points")
+        return self.m2 / (self.count - 1)
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """
+    DDSketch: a value x > 0 goes into bucket ceil(log(x) / log(gamma)), gamma = (1 + alpha) / (1 - alpha),
+    and every value of a bucket is within a relative error alpha of the bucket's representative value.
+    Negative values are counted in a mirrored set of buckets, zeros apart. Infinities (float("inf") accepts
+    the token "inf") are counted apart too, at both ends of the ranking; nan has no rank: it is counted in
+    `nan` and ignored by quantile().
+    When there are more than max_buckets buckets, the lowest ones are merged together (only the accuracy
+    of the smallest magnitudes suffers), so memory stays bounded.
+
+    >>> sketch = QuantileSketch()
+    >>> for x in (1.0, 2.0, math.inf, 3.0, -math.inf, math.nan):
+    ...     sketch.add(x)
+    >>> sketch.quantile(0), round(sketch.median(), 1), sketch.quantile(1), sketch.count, sketch.nan
+    (-inf, 2.0, inf, 5, 1)
+    """
+    def __init__(self, alpha=0.01, max_buckets=2048):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.infinities = [0, 0]    # -inf, +inf
+        self.nan = 0
+        self.count = 0              # every value but nan
+
+    def _key(self, x):
+        return math.ceil(math.log(x) / self.log_gamma)
+
+    def _value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, x):
+        if math.isnan(x):
+            self.nan += 1
+            return
+        self.count += 1
+        if math.isinf(x):
+            self.infinities[x > 0] += 1
+            return
+        if x > 0:
+            store = self.positive
+        elif x < 0:
+            store, x = self.negative, -x
+        else:
+            self.zeros += 1
+            return
+        k = self._key(x)
+        store[k] = store.get(k, 0) + 1
+        if len(store) > self.max_buckets:
+            self._collapse(store, self.max_buckets)
+
+    def add_array(self, x):
+        """
+        Add every value of a NumPy array at once, with the same result as add() for each.
+
+        >>> x = np.array([1.0, 2.0, math.inf, 3.0, -math.inf, math.nan, 0.0, -4.0])
+        >>> vectorized, scalar = QuantileSketch(), QuantileSketch()
+        >>> vectorized.add_array(x)
+        >>> for v in x.tolist():
+        ...     scalar.add(v)
+        >>> vars(vectorized) == vars(scalar), round(vectorized.median(), 1)
+        (True, 1.0)
+        >>> round(StreamingStats.from_array(np.array([1.0, 2.0, math.inf, 3.0])).median(), 1)
+        2.0
+        """
+        finite = np.isfinite(x)
+        if not finite.all():
+            nan = np.isnan(x)
+            self.nan += int(np.count_nonzero(nan))
+            self.infinities[0] += int(np.count_nonzero(x == -np.inf))
+            self.infinities[1] += int(np.count_nonzero(x == np.inf))
+            self.count += int(np.count_nonzero(~nan)) - int(np.count_nonzero(finite))
+            x = x[finite]
+        self.count += len(x)
+        self.zeros += int(np.count_nonzero(x == 0))
+        for store, values in ((self.positive, x[x > 0]), (self.negative, -x[x < 0])):
+            keys, counts = np.unique(np.ceil(np.log(values) / self.log_gamma).astype(np.int64),
+                                     return_counts=True)
+            for k, c in zip(keys.tolist(), counts.tolist()):
+                store[k] = store.get(k, 0) + c
+            if len(store) > self.max_buckets:
+                self._collapse(store, self.max_buckets)
+
+    def merge(self, other):
+        """Combine with the sketch of another chunk (same alpha)."""
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different accuracies")
+        self.count += other.count
+        self.zeros += other.zeros
+        self.infinities = [a + b for a, b in zip(self.infinities, other.infinities)]
+        self.nan += other.nan
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for k, c in other_store.items():
+                store[k] = store.get(k, 0) + c
+            if len(store) > self.max_buckets:
+                self._collapse(store, self.max_buckets)
+
+    @staticmethod
+    def _collapse(store, size):
+        # fold the lowest buckets into one so that `size` buckets remain
+        keys = sorted(store)
+        excess = len(keys) - size
+        target = keys[excess]
+        for k in keys[:excess]:
+            store[target] += store.pop(k)
+
+    def quantile(self, q):
+        if not self.count:
+            raise statistics.StatisticsError("no data points")
+        rank = q * (self.count - 1)
+        seen = self.infinities[0]
+        if seen > rank:
+            return -math.inf
+        for k in sorted(self.negative, reverse=True):    # most negative values first
+            seen += self.negative[k]
+            if seen > rank:
+                return -self._value(k)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.positive):
+            seen += self.positive[k]
+            if seen > rank:
+                return self._value(k)
+        return math.inf if self.infinities[1] else self._value(max(self.positive))
+
+    def median(self):
+        return self.quantile(0.5)
+
+
+class StreamingStats:
+    """The five TD4 statistics in one pass: approximate median, or exact when exact=True."""
+    def __init__(self, exact=False, alpha=0.01):
+        self.running = RunningStats()
+        self.sketch = None if exact else QuantileSketch(alpha)
+        self.values = array('d') if exact else None
+
+    def update(self, x):
+        self.running.update(x)
+        if self.values is not None:
+            self.values.append(x)
+        else:
+            self.sketch.add(x)
+
+    def update_many(self, xs):
+        for x in xs:
+            self.update(x)
+
+    @classmethod
+    def from_array(cls, x, alpha=0.01):
+        """Approximate partial aggregate of a NumPy array."""
+        stats = cls(alpha=alpha)
+        stats.running = RunningStats.from_array(x)
+        stats.sketch.add_array(x)
+        return stats
+
+    def merge(self, other):
+        self.running.merge(other.running)
+        if self.values is not None:
+            self.values.extend(other.values)
+        else:
+            self.sketch.merge(other.sketch)
+
+    def median(self):
+        if self.values is not None:
+            return statistics.median(self.values)
+        return self.sketch.median()
+
+    def results(self):
+        """
+        [(name, value)] in the order of the TD4 operations; Stdev is nan with fewer than two values.
+
+        >>> stats = StreamingStats(exact=True)
+        >>> stats.update(4.0)
+        >>> stats.results()
+        [('Min', 4.0), ('Max', 4.0), ('Median', 4.0), ('Mean', 4.0), ('Stdev', nan)]
+        """
+        stdev = self.running.stdev if self.running.count >= 2 else math.nan
+        return [("Min", self.running.min), ("Max", self.running.max), ("Median", self.median()),
+                ("Mean", self.running.mean), ("Stdev", stdev)]
+
+
+def parse_chunk(data):
+    """
+    Parse a chunk of text into a float64 array and the list of its first bad tokens.
+
+    >>> parse_chunk("1 2 3\\n")[0].tolist()
+    [1.0, 2.0, 3.0]
+    >>> parse_chunk("\\n")[0].tolist()       # e.g. the trailing rest of a stream
+    []
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    values, bad = parse_block(data)
+    return values, [token for token, position, index in bad[:MAX_BAD]]
+
+
+def chunk_partial(data):
+    """Pool task: partial aggregate of one chunk of text."""
+    values, bad = parse_chunk(data)
+    return StreamingStats.from_array(values), bad
+
+
+def file_chunk_partial(task):
+    """
+    Pool task: partial aggregate of the byte range [start, end) of a file.
+    A token belongs to the chunk where it starts: skip the one cut at `start`, finish the one cut at `end`.
+    """
+    path, start, end = task
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            data = f.read(end - start + 1)
+            if not data[:1].isspace():
+                first_space = re.search(rb"\s", data)
+                data = data[first_space.start():] if first_space else b""
+        else:
+            data = f.read(end)
+        if data and not data[-1:].isspace():
+            tail = bytearray()
+            while True:
+                c = f.read(1)
+                if not c or c.isspace():
+                    break
+                tail += c
+            data += bytes(tail)
+    return chunk_partial(data)
+
+
+def merge_partials(partials, on_error=None):
+    total = StreamingStats()
+    for partial, bad in partials:
+        total.merge(partial)
+        for s in bad:
+            if on_error:
+                on_error(s)
+    return total
+
+
+def parallel_stats(path, processes=None, chunk_bytes=CHUNK_BYTES, on_error=None):
+    """Statistics of a file of numbers, every pool worker reading and reducing its own byte ranges."""
+    size = os.path.getsize(path)
+    tasks = [(path, start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)]
+    with multiprocessing.Pool(processes=processes) as pool:
+        return merge_partials(pool.imap_unordered(file_chunk_partial, tasks), on_error)
+
+
+def parallel_stats_stream(stream, processes=None, chunk_size=CHUNK_BYTES, on_error=None):
+    """Same thing on a stream (e.g. stdin): the parent reads the chunks and ships them to the workers."""
+    def chunks():
+        rest = b""
+        while True:
+            data = stream.read(chunk_size)
+            if not data:
+                break
+            data = rest + data
+            cut = max(data.rfind(b" "), data.rfind(b"\n"), data.rfind(b"\t"))
+            if cut < 0:
+                rest = data
+                continue
+            rest = data[cut:]
+            yield data[:cut]
+        if rest:
+            yield rest
+
+    with multiprocessing.Pool(processes=processes) as pool:
+        return merge_partials(pool.imap_unordered(chunk_partial, chunks()), on_error)
+
+
+def stat_main(exact=False, stream=None):
+    stats = StreamingStats(exact)
+    stats.update_many(read_numbers(stream or sys.stdin, on_error=lambda s: print(f"bad number: {s}")))
+    print_results(stats)
+
+
+def print_results(stats):
+    if not stats.running.count:
+        print("No valid data entered.")
+        return
+    for name, result in stats.results():
+        print(f"{name}: {result}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--processes" in args:
+        i = args.index("--processes")
+        processes = int(args[i + 1])
+        paths = args[:i] + args[i + 2:]
+        report_bad = lambda s: print(f"bad number: {s}")
+        if paths:
+            print_results(parallel_stats(paths[0], processes, on_error=report_bad))
+        else:
+            print_results(parallel_stats_stream(sys.stdin.buffer, processes, on_error=report_bad))
+    else:
+        stat_main(exact="--exact" in args)
@@ -0,0 +1,236 @@
+"""
+ASYNCIO TIME SERVER WITH PERSISTENT CONNECTIONS
+-----------------------------------------------
+The TD5 Ex2 socket server (handle_client + ThreadPoolExecutor) services a single request per connection
+and then closes the socket, so every "time" request pays a TCP connection set-up. Its main loop is a
+select.select() with a 1 second timeout: a "terminate" request is only noticed on the next tick.
+
+This version is built on asyncio:
+- one coroutine per connection instead of one pool thread, and the connection is kept alive for as many
+  requests as the client wants;
+- requests are lines ("time\\n" or "terminate\\n", "1" and "2" are accepted too) and replies are lines,
+  so a client may pipeline: send many requests at once, then read the replies in the same order;
+- "terminate" sets an asyncio.Event awaited by the server: it closes the listening socket and cancels
+  the open connections at once, without waiting for any tick.
+
+compare() starts each server in its own process and measures request latency, throughput with several
+clients, and shutdown time:
+    python Time_Asyncio.py          # run the asyncio server
+    python Time_Asyncio.py compare  # latency/throughput comparison with the TD5 thread-pool server
+"""
+import sys
+import math
+import time
+import socket
+import select
+import asyncio
+import threading
+import statistics
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+HOST = "localhost"
+PORT = 1789
+
+
+def time_reply(request):
+    """Reply of the server to one request; None means terminate."""
+    if request in ("time", "1"):
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if request in ("terminate", "2"):
+        return None
+    return "Invalid request. Use 'time' or 'terminate'."
+
+
+async def handle_client(reader, writer, shutdown):
+    while True:
+        line = await reader.readline()
+        if not line:                    # the client has closed the connection
+            break
+        response = time_reply(line.decode('utf-8').strip().lower())
+        if response is None:
+            writer.write(b"Server is shutting down...\n")
+            await writer.drain()
+            shutdown.set()
+            break
+        writer.write(response.encode('utf-8') + b"\n")
+        await writer.drain()            # only waits if the client does not read its replies
+
+
+async def serve(host=HOST, port=PORT):
+    shutdown = asyncio.Event()
+    connections = set()
+
+    async def on_connect(reader, writer):
+        task = asyncio.current_task()
+        connections.add(task)
+        try:
+            await handle_client(reader, writer, shutdown)
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            connections.discard(task)
+            writer.close()
+
+    server = await asyncio.start_server(on_connect, host, port, reuse_address=True)
+    print(f"Time server is running on {host}:{port}...")
+    await shutdown.wait()
+
+    # Immediate shutdown: stop accepting, then cancel every open connection
+    server.close()
+    for task in list(connections):
+        task.cancel()
+    await asyncio.gather(*connections, return_exceptions=True)
+    await server.wait_closed()
+    print("Server shut down gracefully.")
+
+
+def run_asyncio_server(host=HOST, port=PORT):
+    asyncio.run(serve(host, port))
+
+
+def run_threadpool_server(host=HOST, port=PORT):
+    """The TD5 Ex2 server, kept for comparison: one request per connection, 1 s select tick."""
+    state = {"serve": True}
+
+    def handle(client_socket):
+        with client_socket:
+            try:
+                request = client_socket.recv(1024).decode('utf-8').strip().lower()
+                response = time_reply(request)
+                if response is None:
+                    state["serve"] = False
+                    response = "Server is shutting down..."
+                client_socket.sendall(response.encode('utf-8'))
+            except Exception as e:
+                print(f"Error handling client: {e}")
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_socket.bind((host, port))
+        server_socket.listen(5)
+        server_socket.setblocking(False)
+        with ThreadPoolExecutor(max_workers=4) as thread_pool:
+            while state["serve"]:
+                readable, _, _ = select.select([server_socket], [], [], 1)
+                if server_socket in readable:
+                    try:
+                        client_socket, address = server_socket.accept()
+                    except BlockingIOError:
+                        continue
+                    client_socket.setblocking(True)
+                    thread_pool.submit(handle, client_socket)
+
+
+# --- comparison ---------------------------------------------------------------
+
+def recv_until_closed(sock):
+    chunks = []
+    while True:
+        data = sock.recv(1024)
+        if not data:
+            return b"".join(chunks)
+        chunks.append(data)
+
+
+def one_shot_requests(host, port, n):
+    """Thread-pool protocol: a new connection per request. Returns per-request latencies."""
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        with socket.create_connection((host, port)) as s:
+            s.sendall(b"time")
+            recv_until_closed(s)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def persistent_requests(host, port, n, pipeline=1):
+    """
+    Asyncio protocol: one connection, `pipeline` requests in flight at a time.
+    The latency of a request is from the send of its batch to the arrival of its own reply.
+    """
+    latencies = []
+    with socket.create_connection((host, port)) as s:
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        for i in range(0, n, pipeline):
+            batch = min(pipeline, n - i)
+            start = time.perf_counter()
+            s.sendall(b"time\n" * batch)
+            replies = 0
+            while replies < batch:
+                data = s.recv(65536)
+                if not data:
+                    raise ConnectionError("connection closed by the server")
+                arrived = data.count(b"\n")      # replies completed by this read
+                latencies.extend([time.perf_counter() - start] * arrived)
+                replies += arrived
+    return latencies
+
+
+def wait_for_server(host, port, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port)).close()
+            return
+        except OSError:
+            time.sleep(0.01)
+    raise TimeoutError(f"no server on {host}:{port}")
+
+
+def terminate_server(host, port, process, persistent):
+    start = time.perf_counter()
+    with socket.create_connection((host, port)) as s:
+        s.sendall(b"terminate\n" if persistent else b"terminate")
+        s.recv(1024)
+    process.join()
+    return time.perf_counter() - start
+
+
+def p99(values):
+    """Nearest-rank 99th percentile."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(0.99 * len(ordered)), 1) - 1]
+
+
+def measure(name, target, client, host, port, requests, clients, persistent):
+    process = multiprocessing.Process(target=target, args=(host, port))
+    process.start()
+    wait_for_server(host, port)
+
+    latencies = client(requests)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.extend(client(requests))) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    throughput = len(results) / (time.perf_counter() - start)
+
+    shutdown = terminate_server(host, port, process, persistent)
+    print(f"{name:<28} median latency {statistics.median(latencies) * 1e6:8.0f} us   "
+          f"p99 {p99(latencies) * 1e6:8.0f} us   "
+          f"{throughput:9.0f} req/s ({clients} clients)   shutdown {shutdown * 1000:6.1f} ms")
+
+
+def compare(host=HOST, port=PORT, requests=2000, clients=8):
+    measure("thread pool, 1 req/conn", run_threadpool_server,
+            lambda n: one_shot_requests(host, port, n), host, port, requests, clients, False)
+    measure("asyncio, persistent", run_asyncio_server,
+            lambda n: persistent_requests(host, port, n), host, port, requests, clients, True)
+    measure("asyncio, pipelined x32", run_asyncio_server,
+            lambda n: persistent_requests(host, port, n, pipeline=32), host, port, requests, clients, True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        compare()
+    else:
+        try:
+            run_asyncio_server()
+        except KeyboardInterrupt:
+            print("\nServer interrupted by user. Shutting down.")
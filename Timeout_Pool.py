@@ -0,0 +1,315 @@
+"""
+PROCESS POOL WITH REAL TIMEOUTS
+-------------------------------
+In Thread&ProcessPools.py (and TD5), pool.apply_async(time.sleep, (5,)).get(timeout=1) raises TimeoutError after
+1 second, but only the caller stops waiting: the worker keeps sleeping for the full 5 seconds. Until then the
+pool has one worker less, and nothing tells it.
+
+TimeoutPool enforces the timeout on the task itself:
+- apply_async(func, args, timeout=...) (or a default timeout for the pool) gives every task a deadline, from
+  the moment a worker starts it. When it is exceeded, the worker is killed, the task's result raises
+  TaskTimeout, and a replacement worker is forked at once, before a task needs it;
+- a task that has not started yet can be cancelled: result.cancel() removes it from the queue;
+- stats() counts completed, failed, timed out and cancelled tasks, workers recycled, and the capacity lost
+  (worker-seconds spent on killed tasks plus the time to fork their replacements).
+
+Each worker has its own pipe; a dispatcher thread sends tasks to idle workers and waits, with
+multiprocessing.connection.wait(), for a result or for the nearest deadline.
+
+    python Timeout_Pool.py       # the "deliberate timeout" of Thread&ProcessPools.py, with and without kill
+"""
+import os
+import time
+import threading
+import traceback
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
+
+class TaskTimeout(multiprocessing.TimeoutError):
+    """The task ran longer than its timeout; its worker was killed."""
+
+
+class CancelledError(Exception):
+    """The task was cancelled before it started."""
+
+
+def _worker(conn):
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        func, args, kwargs = task
+        try:
+            result = (True, func(*args, **kwargs))
+        except Exception as e:
+            result = (False, e)
+        try:
+            conn.send(result)
+        except Exception as e:      # unpicklable result or exception
+            conn.send((False, RuntimeError(f"cannot send back the result: {e!r}\n{traceback.format_exc()}")))
+
+
+class AsyncResult:
+    def __init__(self, pool, task, timeout):
+        self._pool = pool
+        self._task = task
+        self.timeout = timeout
+        self._event = threading.Event()
+        self._success = None
+        self._value = None
+        self._cancelled = False
+
+    def _set(self, success, value):
+        self._success, self._value = success, value
+        self._event.set()
+
+    def ready(self):
+        return self._event.is_set()
+
+    def successful(self):
+        if not self.ready():
+            raise ValueError(f"{self!r} not ready")
+        return self._success
+
+    def wait(self, timeout=None):
+        self._event.wait(timeout)
+
+    def get(self, timeout=None):
+        """The result; TimeoutError if it is not ready within `timeout` (the task goes on), TaskTimeout if killed."""
+        if not self._event.wait(timeout):
+            raise multiprocessing.TimeoutError
+        if self._success:
+            return self._value
+        raise self._value
+
+    def cancel(self):
+        """Cancel the task if it has not started yet; return True if it was cancelled."""
+        return self._pool._cancel(self)
+
+    def cancelled(self):
+        return self._cancelled
+
+
+class Worker:
+    def __init__(self, context):
+        start = time.perf_counter()
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.spawn_time = time.perf_counter() - start
+        self.result = None      # AsyncResult of the running task
+        self.started = None
+        self.deadline = None
+
+
+class TimeoutPool:
+    def __init__(self, processes=None, timeout=None, context=None):
+        self.processes = processes or os.cpu_count()
+        self.timeout = timeout
+        self.context = context or multiprocessing.get_context()
+        self.workers = [Worker(self.context) for _ in range(self.processes)]
+        self.pending = deque()      # AsyncResult of the tasks not started yet
+        self.metrics = dict(completed=0, failed=0, timed_out=0, cancelled=0, workers_recycled=0, capacity_lost=0.0)
+        self._lock = threading.Lock()
+        self._wake_r, self._wake_w = multiprocessing.Pipe(duplex=False)
+        self._state = "running"
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    # --- submitting ---
+    def apply_async(self, func, args=(), kwds=None, timeout=None):
+        """Run func(*args, **kwds) in a worker, killed after `timeout` seconds (default: the pool's timeout)."""
+        with self._lock:
+            if self._state != "running":
+                raise ValueError("Pool not running")
+            result = AsyncResult(self, (func, tuple(args), kwds or {}), self.timeout if timeout is None else timeout)
+            self.pending.append(result)
+        self._wake()
+        return result
+
+    def apply(self, func, args=(), kwds=None, timeout=None):
+        return self.apply_async(func, args, kwds, timeout).get()
+
+    def map(self, func, iterable, timeout=None):
+        results = [self.apply_async(func, (x,), timeout=timeout) for x in iterable]
+        return [r.get() for r in results]
+
+    def _cancel(self, result):
+        with self._lock:
+            try:
+                self.pending.remove(result)
+            except ValueError:
+                return False    # already started (or done)
+            result._cancelled = True
+            self.metrics["cancelled"] += 1
+        result._set(False, CancelledError("task cancelled before it started"))
+        return True
+
+    def _wake(self):
+        self._wake_w.send_bytes(b"")
+
+    # --- dispatcher thread ---
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if self._state == "terminated" or (self._state == "closed" and not self.pending
+                                                   and all(w.result is None for w in self.workers)):
+                    break
+                for worker in self.workers:
+                    if worker.result is None and self.pending:
+                        self._start(worker, self.pending.popleft())
+            busy = {w.conn: w for w in self.workers if w.result is not None}
+            deadlines = [w.deadline for w in busy.values() if w.deadline is not None]
+            timeout = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+            for conn in wait(list(busy) + [self._wake_r], timeout):
+                if conn is self._wake_r:
+                    self._wake_r.recv_bytes()
+                else:
+                    self._finish(busy[conn])
+            now = time.monotonic()
+            for worker in busy.values():
+                if worker not in self.workers:  # died during this wait, already replaced by _finish
+                    continue
+                if worker.result is not None and worker.deadline is not None and now >= worker.deadline:
+                    self._kill(worker)
+
+    def _start(self, worker, result):
+        worker.result = result
+        worker.started = time.monotonic()
+        worker.deadline = None if result.timeout is None else worker.started + result.timeout
+        try:
+            worker.conn.send(result._task)
+        except Exception as e:      # e.g. an unpicklable function or argument
+            worker.result = None
+            self.metrics["failed"] += 1
+            result._set(False, e)
+
+    def _finish(self, worker):
+        result = worker.result
+        try:
+            success, value = worker.conn.recv()
+        except EOFError:    # the worker died (e.g. os._exit or a crash in C code): replace it
+            worker.result = None
+            self._replace(worker)
+            result._set(False, RuntimeError(f"worker {worker.process.pid} died during the task"))
+            self.metrics["failed"] += 1
+            return
+        worker.result = None
+        self.metrics["completed" if success else "failed"] += 1
+        result._set(success, value)
+
+    def _kill(self, worker):
+        result = worker.result
+        worker.process.kill()
+        busy_for = time.monotonic() - worker.started
+        replacement = self._replace(worker)
+        self.metrics["timed_out"] += 1
+        self.metrics["capacity_lost"] += busy_for + replacement.spawn_time
+        result._set(False, TaskTimeout(f"task killed after {result.timeout} s"))
+
+    def _replace(self, worker):
+        worker.process.join()
+        worker.conn.close()
+        replacement = Worker(self.context)
+        with self._lock:
+            self.workers[self.workers.index(worker)] = replacement
+        self.metrics["workers_recycled"] += 1
+        return replacement
+
+    # --- metrics and shutdown ---
+    def stats(self):
+        with self._lock:
+            return dict(self.metrics, busy=sum(w.result is not None for w in self.workers), queued=len(self.pending))
+
+    def close(self):
+        """No more tasks; the workers stop once the queued tasks are done."""
+        with self._lock:
+            if self._state == "running":
+                self._state = "closed"
+        self._wake()
+
+    def terminate(self):
+        """Stop now: kill the workers, cancel the queued tasks."""
+        with self._lock:
+            self._state = "terminated"
+        self._wake()
+        self._dispatcher.join()
+        for worker in self.workers:
+            worker.process.kill()
+            worker.process.join()
+            if worker.result is not None:
+                worker.result._set(False, CancelledError("pool terminated"))
+        while self.pending:
+            self.pending.popleft()._set(False, CancelledError("pool terminated"))
+
+    def join(self):
+        self._dispatcher.join()
+        for worker in self.workers:
+            worker.conn.send(None)
+            worker.process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.terminate()
+
+
+def fibonacci(n):
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+
+
+def sleep_and_exit(seconds, code=1):
+    """
+    A task whose worker dies after `seconds`, without sending anything back.
+    A worker dying just before its deadline must not stop the dispatcher:
+
+    >>> with TimeoutPool(processes=2) as pool:
+    ...     results = [pool.apply_async(sleep_and_exit, (0.047,), timeout=0.05) for _ in range(20)]
+    ...     deadline = time.monotonic() + 5
+    ...     for r in results:
+    ...         r.wait(max(deadline - time.monotonic(), 0))
+    ...     print(all(r.ready() and not r.successful() for r in results), pool.apply_async(fibonacci, (10,)).get(5))
+    True 55
+    """
+    time.sleep(seconds)
+    os._exit(code)
+
+
+def deliberate_timeout(pool_class):
+    """Thread&ProcessPools.py's deliberate timeout, then a short task on the same single-worker pool."""
+    with pool_class(processes=1) as pool:
+        start = time.perf_counter()
+        try:
+            if pool_class is TimeoutPool:
+                pool.apply_async(time.sleep, (5,), timeout=1).get()     # the task itself is stopped
+            else:
+                pool.apply_async(time.sleep, (5,)).get(timeout=1)       # only the caller stops waiting
+        except multiprocessing.TimeoutError as e:
+            print(f"  {type(e).__name__} after {time.perf_counter() - start:.1f} s")
+        print(f"  fibonacci(30) = {pool.apply(fibonacci, (30,))}, ready after {time.perf_counter() - start:.1f} s")
+        if pool_class is TimeoutPool:
+            print(f"  {pool.stats()}")
+
+
+if __name__ == "__main__":
+    print("multiprocessing.Pool:")
+    deliberate_timeout(multiprocessing.Pool)
+    print("TimeoutPool:")
+    deliberate_timeout(TimeoutPool)
+
+    with TimeoutPool(processes=1) as pool:
+        running = pool.apply_async(time.sleep, (0.5,))
+        queued = pool.apply_async(fibonacci, (10,))
+        time.sleep(0.1)     # the first task has started by now
+        print("cancel running task:", running.cancel(), "- cancel queued task:", queued.cancel())
+        print(pool.stats())
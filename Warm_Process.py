@@ -0,0 +1,309 @@
+"""
+WARM WORKER PROCESSES
+---------------------
+Process_Python_Intro.py, TD1.py and TD3.py create a new multiprocessing.Process for every unit of work (greet(),
+the Greet subclass, one echo handler per client). start() pays for a fork (or, with spawn, a whole interpreter
+start-up and the imports of the main module) before the first instruction of the task runs.
+
+ProcessFactory keeps `processes` worker processes started in advance, idle, waiting on a pipe. Its handles
+behave like Process objects:
+
+    factory = ProcessFactory(4)
+    p = factory.Process(target=greet, args=("Kitty",))     # like Process(target=..., args=...)
+    p.start()
+    p.join()
+    p = factory.wrap(Greet("Kitty"))                        # a Process subclass: its run() runs in a worker
+    p.start()
+    p.join()
+
+start() only sends the task to an idle worker: the cost of creating the process was paid before.
+- reuse=False (default): a worker runs one task and exits, like a fresh Process; a replacement is forked
+  in the background right away, so that the next start() finds a warm worker;
+- reuse=True: a worker runs task after task. Faster, but module-level state changed by a task is seen by the
+  next one on the same worker;
+- method="forkserver": workers are forked from the forkserver process, with the modules of `preload` already
+  imported there; with "fork" (default), they are imported in this process before the workers are forked.
+
+The task is sent pickled, so the target must be picklable (a module-level function), like with spawn. A Process
+subclass is sent as its class and its attributes (Process objects themselves cannot be pickled).
+
+    python Warm_Process.py       # spawn-to-first-instruction latency, plain Process vs factory
+"""
+import os
+import sys
+import time
+import queue
+import struct
+import traceback
+import importlib
+import threading
+import multiprocessing
+from multiprocessing import process as mp_process
+from multiprocessing.shared_memory import SharedMemory
+
+# attributes of the parent's Process object, rebuilt by _adopt() in the worker
+STATE_EXCLUDED = ("_config", "_popen", "_parent_pid", "_parent_name", "_identity", "_closed")
+TIMESTAMP = struct.Struct("d")
+
+
+def _adopt(process, config):
+    """
+    Give the rebuilt Process the attributes it would have in a child of its own: its config (daemon...) with
+    the authkey of this worker (inherited from the same parent), and make it current_process() while it runs.
+    """
+    worker = mp_process._current_process
+    process._config = {**worker._config, "daemon": False, **config}     # the worker itself is a daemon
+    process._parent_pid = worker._parent_pid
+    process._parent_name = worker._parent_name
+    process._identity = worker._identity
+    process._popen = None
+    process._closed = False
+    mp_process._current_process = process
+
+
+def _worker(conn, reuse):
+    """Warm worker: wait for (class, attributes, config) of a Process, call its run(), report the exit code."""
+    worker = mp_process._current_process
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        cls, state, config = task
+        exitcode = 0
+        try:
+            process = cls.__new__(cls)
+            process.__dict__.update(state)
+            _adopt(process, config)
+            process.run()
+        except SystemExit as e:
+            exitcode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            traceback.print_exc()
+            exitcode = 1
+        finally:
+            mp_process._current_process = worker
+        sys.stdout.flush()
+        sys.stderr.flush()
+        conn.send(exitcode)
+        if not reuse:
+            break
+    conn.close()
+
+
+class WarmProcess:
+    """Process-like handle of a task run by a warm worker."""
+    def __init__(self, factory, process):
+        self._factory = factory
+        self._process = process
+        self._conn = None
+        self.pid = None
+        self.exitcode = None
+
+    @property
+    def name(self):
+        return self._process.name
+
+    def start(self):
+        if self._conn is not None:
+            raise AssertionError("cannot start a process twice")
+        state = {k: v for k, v in vars(self._process).items() if k not in STATE_EXCLUDED}
+        config = {k: v for k, v in self._process._config.items() if k != "authkey"}    # the key cannot be pickled
+        worker, self._conn = self._factory._take()
+        self.pid = worker.pid
+        self._worker = worker
+        try:
+            self._conn.send((type(self._process), state, config))
+        except Exception:
+            self._factory._release(worker, self._conn, failed=True)
+            raise
+        finally:
+            self._factory._replenish()
+
+    def join(self, timeout=None):
+        if self._conn is None:
+            raise AssertionError("can only join a started process")
+        if self.exitcode is not None or not self._conn.poll(timeout):
+            return
+        try:
+            self.exitcode = self._conn.recv()
+        except EOFError:    # the worker died during the task
+            self._worker.join()
+            self.exitcode = self._worker.exitcode
+            return
+        self._factory._release(self._worker, self._conn)
+
+    def is_alive(self):
+        if self._conn is None:
+            return False
+        self.join(0)
+        return self.exitcode is None
+
+
+class ProcessFactory:
+    def __init__(self, processes=None, reuse=False, method="fork", preload=()):
+        self.processes = processes or os.cpu_count()
+        self.reuse = reuse
+        self.context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            self.context.set_forkserver_preload(list(preload))
+        else:
+            for module in preload:
+                importlib.import_module(module)
+        self.idle = queue.Queue()       # (worker, connection) ready to run a task
+        self.busy = {}                  # worker -> connection, running a task
+        self.workers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._spawning = []
+        for _ in range(self.processes):
+            self._spawn()
+
+    def _spawn(self):
+        parent, child = self.context.Pipe()
+        worker = self.context.Process(target=_worker, args=(child, self.reuse), daemon=True)
+        worker.start()
+        child.close()
+        with self._lock:
+            self.workers.add(worker)
+            if self._closed:    # closed while this worker was being forked
+                parent.send(None)
+                parent.close()
+                return
+        self.idle.put((worker, parent))
+
+    def _take(self):
+        """An idle worker, or a new one if they are all busy."""
+        if self._closed:
+            raise ValueError("factory is closed")
+        try:
+            worker, conn = self.idle.get_nowait()
+        except queue.Empty:     # every worker is busy: fall back to a cold start
+            self._spawn()
+            worker, conn = self.idle.get()
+        with self._lock:
+            self.busy[worker] = conn
+        return worker, conn
+
+    def _replenish(self):
+        """Fork a replacement in the background, after the task was sent, when workers are not reused."""
+        if not self.reuse:
+            thread = threading.Thread(target=self._spawn)
+            thread.start()
+            self._spawning = [t for t in self._spawning if t.is_alive()] + [thread]
+
+    def _release(self, worker, conn, failed=False):
+        with self._lock:
+            self.busy.pop(worker, None)
+            closed = self._closed
+        if self.reuse and not closed and not failed:
+            self.idle.put((worker, conn))
+        else:
+            conn.close()
+            worker.join()
+            with self._lock:
+                self.workers.discard(worker)
+
+    def Process(self, target=None, args=(), kwargs=None, name=None):
+        return self.wrap(multiprocessing.Process(target=target, args=args, kwargs=kwargs or {}, name=name))
+
+    def wrap(self, process):
+        """Handle running process.run() (a Process or a Process subclass instance) in a warm worker."""
+        return WarmProcess(self, process)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        for thread in self._spawning:
+            thread.join()
+        while True:
+            try:
+                worker, conn = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.send(None)
+            conn.close()
+        with self._lock:
+            if self.reuse:  # busy workers would wait for another task: stop them after this one
+                for conn in self.busy.values():
+                    conn.send(None)
+            workers = list(self.workers)
+        for worker in workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- the Process_Python_Intro.py examples ----------------------------------------
+
+def greet(name):
+    print("Hello,", name, "!")
+
+
+class Greet(multiprocessing.Process):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+    def run(self):
+        print("Hello,", self.name, "!")
+
+
+# --- benchmark ----------------------------------------------------------------
+
+def first_instruction(block):
+    t = time.perf_counter()     # CLOCK_MONOTONIC: comparable between processes on Linux
+    shm = SharedMemory(block)
+    TIMESTAMP.pack_into(shm.buf, 0, t)
+    shm.close()
+
+
+def latency(make, started, repeats):
+    """Median time from start() to the first instruction of the task."""
+    samples = []
+    for _ in range(repeats):
+        p = make()
+        t = time.perf_counter()
+        p.start()
+        p.join()
+        samples.append(TIMESTAMP.unpack_from(started.buf)[0] - t)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def benchmark(repeats=200):
+    # a shared memory block, passed by name: a Value could not be sent to a running worker
+    started = SharedMemory(create=True, size=TIMESTAMP.size)
+    task = dict(target=first_instruction, args=(started.name,))
+    print(f"start() to first instruction (median of {repeats}):")
+    for method in ("fork", "forkserver", "spawn"):
+        ctx = multiprocessing.get_context(method)
+        n = repeats if method == "fork" else repeats // 10
+        print(f"  Process, {method + ':':12}             {latency(lambda: ctx.Process(**task), started, n) * 1e6:9.0f} us")
+    for method in ("fork", "forkserver"):
+        for reuse in (False, True):
+            with ProcessFactory(2, reuse=reuse, method=method, preload=["numpy"]) as factory:
+                time.sleep(0.5)     # let the workers start
+                seconds = latency(lambda: factory.Process(**task), started, repeats)
+            print(f"  ProcessFactory, {method}, reuse={reuse!s:5}: {seconds * 1e6:9.0f} us")
+    started.close()
+    started.unlink()
+
+
+if __name__ == '__main__':
+    with ProcessFactory(2) as factory:
+        p = factory.Process(target=greet, args=("Kitty",))
+        p.start()
+        p.join()
+
+        p = factory.wrap(Greet("Kitty"))
+        p.start()
+        p.join()
+
+    benchmark()